@@ -0,0 +1,76 @@
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from netsec.buffers import BufferPool
+from netsec.protocol import TextProtocol
+
+REQUEST = b"5 2 127.0.0.1 8081\n"
+
+# Receive one request the way the relay server did before receive buffers: recv, decode, split and strip
+def legacy_receive(conn, receive_buffer):
+    data = conn.recv(1024)
+    i1, i2, i3, i4 = map(str.strip, data.decode().split(" "))
+    return float(i1), float(i2), i3, int(i4)
+
+# Receive one request into the connection's pooled receive buffer and parse it in place
+def pooled_receive(conn, receive_buffer):
+    request = receive_buffer.take_line()
+    while request is None:
+        receive_buffer.fill(conn)
+        request = receive_buffer.take_line()
+    return TextProtocol.parse_request(receive_buffer.buffer, *request)
+
+# Serve the given number of connections and report the transient memory allocated per request
+def run(name, receive, connections, requests):
+    pool = BufferPool(4096, 1)
+    transient = 0
+    started = time.perf_counter()
+    for _ in range(connections):
+        server, client = socket.socketpair()
+        receive_buffer = pool.acquire()
+        # Release one request at a time so that every recv returns exactly one request, as with a lockstep client
+        ready = threading.Semaphore(0)
+
+        def send():
+            for _ in range(requests):
+                ready.acquire()
+                client.sendall(REQUEST)
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        tracemalloc.start()
+        for _ in range(requests):
+            ready.release()
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            receive(server, receive_buffer)
+            transient += tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+        sender.join()
+        pool.release(receive_buffer)
+        server.close()
+        client.close()
+    elapsed = time.perf_counter() - started
+    total = connections * requests
+    print(f"{name}: {total} requests in {elapsed:.2f}s, {transient / total:.0f} transient bytes per request")
+    if receive is pooled_receive:
+        print(f"{name}: {pool.allocations} receive buffers allocated, {pool.reuses} reused")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare allocation churn of the legacy and pooled receive paths.")
+    parser.add_argument("--connections", type=int, default=20, help="Number of connections (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per connection (default: %(default)s)")
+    args = parser.parse_args()
+
+    run("legacy recv + decode + split", legacy_receive, args.connections, args.requests)
+    run("pooled recv_into + in-place parse", pooled_receive, args.connections, args.requests)
+
+if __name__ == "__main__":
+    main()
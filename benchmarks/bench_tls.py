@@ -0,0 +1,86 @@
+import argparse
+import logging
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from netsec.relay_server import RelayServer
+from netsec.tls import create_server_context
+
+# Generate a self-signed certificate for localhost with the openssl command
+def generate_certificate(directory):
+    certfile = os.path.join(directory, "server.pem")
+    keyfile = os.path.join(directory, "server.key")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+                    "-addext", "subjectAltName=IP:127.0.0.1", "-keyout", keyfile, "-out", certfile],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return certfile, keyfile
+
+# Find a free port on the loopback interface
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+# Connect and complete a handshake, optionally resuming the given session
+def handshake(client_context, port, session=None):
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        with client_context.wrap_socket(sock, server_hostname="127.0.0.1", session=session) as tls_sock:
+            return tls_sock.session_reused
+
+# Get a resumable session, reading a reply so that TLS 1.3 session tickets are received
+def get_session(client_context, port):
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        with client_context.wrap_socket(sock, server_hostname="127.0.0.1") as tls_sock:
+            tls_sock.sendall(b"5 0 127.0.0.1 1\n")
+            tls_sock.recv(1024)
+            return tls_sock.session
+
+# Run the given number of handshakes with the given concurrency and report their rate
+def run(name, function, count, concurrency):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(lambda _: function(), range(count)))
+    elapsed = time.perf_counter() - started
+    print(f"{name}: {count} handshakes in {elapsed:.2f}s, {count / elapsed:.0f} handshakes per second, "
+          f"{sum(results)} resumed")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure full and resumed TLS handshake rates of the relay server.")
+    parser.add_argument("--handshakes", type=int, default=500, help="Number of handshakes of each kind (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent clients (default: %(default)s)")
+    parser.add_argument("--ciphers", help="OpenSSL cipher string of the server for TLS 1.2")
+    parser.add_argument("--tls-version", choices=["1.2", "1.3"], default="1.3", help="TLS version used by the clients (default: %(default)s)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as directory:
+        certfile, keyfile = generate_certificate(directory)
+        tls_context = create_server_context(certfile, keyfile, ciphers=args.ciphers)
+        port = free_port()
+        relay_server = RelayServer("127.0.0.1", port, args.concurrency * 2, 10.0, 10.0, 60)
+        Thread(target=relay_server.start, kwargs={"tls_context": tls_context}, daemon=True).start()
+        time.sleep(0.5)
+
+        client_context = ssl.create_default_context(cafile=certfile)
+        version = ssl.TLSVersion.TLSv1_3 if args.tls_version == "1.3" else ssl.TLSVersion.TLSv1_2
+        client_context.minimum_version = client_context.maximum_version = version
+
+        run("full", lambda: handshake(client_context, port), args.handshakes, args.concurrency)
+        session = get_session(client_context, port)
+        run("resumed", lambda: handshake(client_context, port, session), args.handshakes, args.concurrency)
+        # Let the server count the last handshakes before reading its counters
+        time.sleep(0.5)
+        print(f"server: {dict(relay_server.handshakes)}")
+        relay_server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import argparse
 import socket
 import getpass
-from config_encryptor import decrypt_data
+from config_encryptor import read_lines
 
 def main():
     # Define the arguments that the script should accept
@@ -17,26 +17,18 @@ def main():
     passphrase = getpass.getpass(prompt='Enter passphrase: ', stream=None)
 
     try:
-        # Decrypt the file
-        with open(args.encrypted_file, 'rb') as f:
-            iv = f.read(16)
-            ciphertext = f.read()
-            tag = ciphertext[-16:]
-            ciphertext = ciphertext[:-16]
-
-        # Decrypt the data
-        plaintext = decrypt_data(iv, ciphertext, tag, passphrase).decode()
-
-        # Create a TCP socket
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        # Decrypt the file as it is read, in either encrypted format
+        with open(args.encrypted_file, 'rb') as f, socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            lines = read_lines(f, passphrase)
+
             # Connect to the server
             s.connect((args.ip, args.port))
 
             # Send the decrypted config file to the server line by line
-            for line in plaintext.splitlines():
+            for line in lines:
                 # Send a line to the server
-                print(line)
-                s.sendall(line.encode())
+                print(line.decode())
+                s.sendall(line)
 
                 # Receive the server's response
                 response = s.recv(1024)
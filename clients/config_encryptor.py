@@ -1,12 +1,35 @@
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
 from Crypto.Hash import SHA256
+from functools import lru_cache
 import argparse
+import os
+import struct
 import sys
 import getpass
+import tempfile
 
+# Magic bytes at the start of a file in the streaming format
+STREAM_MAGIC = b'NSECSTR1'
+
+# Header of a file in the streaming format: magic, chunk size and the 8-byte nonce prefix
+STREAM_HEADER = struct.Struct('!8sI8s')
+
+# Authenticated data of each chunk: its index and whether it is the last one
+CHUNK_AAD = struct.Struct('!Q?')
+
+# Default size in bytes of the plaintext of each chunk
+CHUNK_SIZE = 64 * 1024
+
+# Maximum size in bytes of the plaintext of each chunk
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Size in bytes of the GCM tag after each chunk
+TAG_SIZE = 16
+
+@lru_cache(maxsize=8)
 def generate_key(passphrase):
-    # Hash the passphrase using SHA256
+    # Hash the passphrase using SHA256, once per passphrase
     hash_object = SHA256.new(data=passphrase.encode())
     key = hash_object.digest()
     return key
@@ -48,11 +71,122 @@ def decrypt_data(iv, ciphertext, tag, passphrase):
         print(f"Decryption failed: {e}", file=sys.stderr)
         sys.exit(1)
 
+def chunk_cipher(key, header, nonce_prefix, index, final):
+    # Create the AES-GCM cipher of one chunk, with a nonce made of the file's prefix and the chunk index
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce_prefix + struct.pack('!I', index))
+
+    # Bind the header, the chunk index and the final flag, so that chunks cannot be reordered or dropped
+    cipher.update(header + CHUNK_AAD.pack(index, final))
+    return cipher
+
+def encrypt_stream(source, destination, passphrase, chunk_size=CHUNK_SIZE):
+    try:
+        if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            raise ValueError(f"chunk size must be between 1 and {MAX_CHUNK_SIZE} bytes")
+
+        # Generate a key from the passphrase and a random nonce prefix for this file
+        key = generate_key(passphrase)
+        nonce_prefix = get_random_bytes(8)
+
+        # Write the header
+        header = STREAM_HEADER.pack(STREAM_MAGIC, chunk_size, nonce_prefix)
+        destination.write(header)
+
+        # Encrypt one chunk at a time, reading one chunk ahead to know which one is the last
+        chunk = source.read(chunk_size)
+        index = 0
+        while True:
+            if index >= 2 ** 32:
+                raise ValueError("file has too many chunks, use a larger chunk size")
+            next_chunk = source.read(chunk_size)
+            final = not next_chunk
+            ciphertext, tag = chunk_cipher(key, header, nonce_prefix, index, final).encrypt_and_digest(chunk)
+            destination.write(ciphertext)
+            destination.write(tag)
+            if final:
+                break
+            chunk = next_chunk
+            index += 1
+    except Exception as e:
+        print(f"Encryption failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+def decrypt_stream(source, passphrase):
+    try:
+        # Read and check the header
+        header = source.read(STREAM_HEADER.size)
+        if len(header) < STREAM_HEADER.size:
+            raise ValueError("file is too short")
+        magic, chunk_size, nonce_prefix = STREAM_HEADER.unpack(header)
+        if magic != STREAM_MAGIC:
+            raise ValueError("file is not in the streaming format")
+        if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            raise ValueError(f"invalid chunk size {chunk_size}")
+
+        # Generate a key from the passphrase
+        key = generate_key(passphrase)
+
+        # Decrypt and verify one chunk at a time, reading one chunk ahead to know which one is the last
+        record = source.read(chunk_size + TAG_SIZE)
+        index = 0
+        while True:
+            if len(record) < TAG_SIZE:
+                raise ValueError("file is truncated")
+            next_record = source.read(chunk_size + TAG_SIZE)
+            final = not next_record
+            cipher = chunk_cipher(key, header, nonce_prefix, index, final)
+            yield cipher.decrypt_and_verify(record[:-TAG_SIZE], record[-TAG_SIZE:])
+            if final:
+                break
+            record = next_record
+            index += 1
+    except Exception as e:
+        print(f"Decryption failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+def read_decrypted(f, passphrase):
+    # Yield the plaintext of a file in either format, one verified chunk at a time for the streaming format
+    stream = f.read(len(STREAM_MAGIC)) == STREAM_MAGIC
+    f.seek(0)
+    if stream:
+        yield from decrypt_stream(f, passphrase)
+    else:
+        iv = f.read(16)
+        ciphertext = f.read()
+        tag = ciphertext[-16:]
+        ciphertext = ciphertext[:-16]
+        yield decrypt_data(iv, ciphertext, tag, passphrase)
+
+def read_lines(f, passphrase):
+    # Yield the lines of the plaintext of a file in either format, without their line endings
+    pending = b''
+    for chunk in read_decrypted(f, passphrase):
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip(b'\r')
+    if pending:
+        yield pending.rstrip(b'\r')
+
+def replace_file(filename, write):
+    # Write the new contents next to the original file, then replace it, so that a failure leaves it untouched
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(filename) + '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(temporary, filename)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
 def main():
     # Define command line arguments using argparse
     parser = argparse.ArgumentParser(description='Encrypt or decrypt a file using AES-GCM encryption.')
     parser.add_argument('operation', choices=['encrypt', 'decrypt'], help='the operation to perform (encrypt or decrypt)')
     parser.add_argument('filename', help='the filename of the input file')
+    parser.add_argument('--format', choices=['stream', 'legacy'], default='stream', help='the format of the encrypted file (default: %(default)s)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='the size in bytes of each chunk in the stream format (default: %(default)s)')
 
     # Parse the command line arguments
     args = parser.parse_args()
@@ -62,34 +196,35 @@ def main():
 
     # Perform the requested operation
     if args.operation == 'encrypt':
-        # Read the contents of the input file into memory
-        with open(args.filename, 'rb') as f:
-            data = f.read()
-
-        # Encrypt the data
-        iv, ciphertext, tag = encrypt_data(data, passphrase)
-
-        # Write the IV, ciphertext, and tag to the original file
-        with open(args.filename, 'wb') as f:
-            f.write(iv)
-            f.write(ciphertext)
-            f.write(tag)
+        if args.format == 'stream':
+            # Encrypt the file one chunk at a time
+            with open(args.filename, 'rb') as source:
+                replace_file(args.filename, lambda f: encrypt_stream(source, f, passphrase, args.chunk_size))
+        else:
+            # Read the contents of the input file into memory
+            with open(args.filename, 'rb') as f:
+                data = f.read()
+
+            # Encrypt the data
+            iv, ciphertext, tag = encrypt_data(data, passphrase)
+
+            # Write the IV, ciphertext, and tag to the original file
+            def write(f):
+                f.write(iv)
+                f.write(ciphertext)
+                f.write(tag)
+
+            replace_file(args.filename, write)
 
         print(f"File {args.filename} encrypted successfully.")
     elif args.operation == 'decrypt':
-        # Read the IV, ciphertext, and tag from the input file
-        with open(args.filename, 'rb') as f:
-            iv = f.read(16)
-            ciphertext = f.read()
-            tag = ciphertext[-16:]
-            ciphertext = ciphertext[:-16]
-
-        # Decrypt the data
-        plaintext = decrypt_data(iv, ciphertext, tag, passphrase)
-
-        # Write the plaintext to the original file
-        with open(args.filename, 'wb') as f:
-            f.write(plaintext)
+        # Decrypt the file in either format, writing the plaintext as it is verified
+        with open(args.filename, 'rb') as source:
+            def write(f):
+                for chunk in read_decrypted(source, passphrase):
+                    f.write(chunk)
+
+            replace_file(args.filename, write)
 
         print(f"File {args.filename} decrypted successfully.")
 
@@ -1,7 +1,79 @@
 import argparse
 import socket
 import getpass
-from config_encryptor import decrypt_data
+from collections import deque
+from threading import Event, Semaphore, Thread
+from config_encryptor import read_lines
+
+# Size in bytes above which queued lines are sent to the server
+SEND_BATCH_SIZE = 64 * 1024
+
+def send_lines(s, lines, in_flight, window, closed, errors):
+    # Send newline-terminated lines, batching them while the window has room and flushing when it is full
+    batch = []
+    batch_size = 0
+    try:
+        for line in lines:
+            if not line:
+                continue
+            if not window.acquire(blocking=False):
+                if batch:
+                    s.sendall(b''.join(batch))
+                    batch, batch_size = [], 0
+                window.acquire()
+            # Stop once the server has closed the connection
+            if closed.is_set():
+                return
+            in_flight.append(line)
+            batch.append(line + b'\n')
+            batch_size += len(line) + 1
+            if batch_size >= SEND_BATCH_SIZE:
+                s.sendall(b''.join(batch))
+                batch, batch_size = [], 0
+        if batch:
+            s.sendall(b''.join(batch))
+    except OSError:
+        # The connection was closed by the server, which the receiving thread reports
+        pass
+    except BaseException as e:
+        # Raised again by the receiving thread, including the exit of a failed decryption
+        errors.append(e)
+    finally:
+        # Let the server close the connection once it has answered every line sent
+        try:
+            s.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+def pipeline(s, lines, depth):
+    # Stream lines to the server with up to depth requests in flight, and print each line with its response in order
+    in_flight = deque()
+    window = Semaphore(depth)
+    closed = Event()
+    errors = []
+    sender = Thread(target=send_lines, args=(s, lines, in_flight, window, closed, errors), daemon=True)
+    sender.start()
+
+    # Responses end with \r\n and come back in the order the lines were sent
+    try:
+        with s.makefile('rb') as responses:
+            for response in responses:
+                line = in_flight.popleft() if in_flight else b''
+                print(line.decode())
+                print(response.rstrip(b'\r\n').decode())
+                window.release()
+    except ConnectionResetError:
+        pass
+
+    # Wake up the sender if it is waiting for room in the window, so that it stops
+    closed.set()
+    for _ in range(depth):
+        window.release()
+    sender.join()
+    if errors:
+        raise errors[0]
+    if in_flight:
+        print(f"Error: connection closed by server with {len(in_flight)} requests unanswered.")
 
 def main():
     # Define the arguments that the script should accept
@@ -9,6 +81,7 @@ def main():
     parser.add_argument('ip', metavar='IP', type=str, help='The IP address of the server')
     parser.add_argument('port', metavar='PORT', type=int, help='The port number of the server')
     parser.add_argument('--encrypted_file', metavar='ENCRYPTED_FILE', type=str, help='The path to the encrypted config file', default='good_client_ilies.cfg')
+    parser.add_argument('--pipeline', metavar='DEPTH', type=int, default=0, help='Send newline-terminated lines with up to DEPTH requests in flight instead of waiting for each response')
 
     # Parse the arguments
     args = parser.parse_args()
@@ -17,26 +90,23 @@ def main():
     passphrase = getpass.getpass(prompt='Enter passphrase: ', stream=None)
 
     try:
-        # Decrypt the file
-        with open(args.encrypted_file, 'rb') as f:
-            iv = f.read(16)
-            ciphertext = f.read()
-            tag = ciphertext[-16:]
-            ciphertext = ciphertext[:-16]
-
-        # Decrypt the data
-        plaintext = decrypt_data(iv, ciphertext, tag, passphrase).decode()
-
-        # Create a TCP socket
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        # Decrypt the file as it is read, in either encrypted format
+        with open(args.encrypted_file, 'rb') as f, socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            lines = read_lines(f, passphrase)
+
             # Connect to the server
             s.connect((args.ip, args.port))
 
+            # Stream the decrypted config file to the server with many requests in flight
+            if args.pipeline > 0:
+                pipeline(s, lines, args.pipeline)
+                return
+
             # Send the decrypted config file to the server line by line
-            for line in plaintext.splitlines():
+            for line in lines:
                 # Send a line to the server
-                print(line)
-                s.sendall(line.encode())
+                print(line.decode())
+                s.sendall(line)
 
                 # Receive the server's response
                 response = s.recv(1024)
@@ -0,0 +1,170 @@
+from threading import Lock
+
+class BufferPool:
+    """
+    A pool of fixed-size receive buffers reused across client connections.
+
+    Attributes:
+        buffer_size (int): The size in bytes of every buffer in the pool.
+        max_idle (int): The maximum number of released buffers kept for reuse.
+        allocations (int): The number of buffers allocated since the pool was created.
+        reuses (int): The number of times a released buffer was handed out again.
+    """
+
+    def __init__(self, buffer_size, max_idle):
+        """
+        Initialize a BufferPool object with the given parameters.
+
+        Args:
+            buffer_size (int): The size in bytes of every buffer in the pool.
+            max_idle (int): The maximum number of released buffers kept for reuse.
+        """
+        self.buffer_size = buffer_size
+        self.max_idle = max_idle
+        self.allocations = 0
+        self.reuses = 0
+        self._idle = []
+        self._lock = Lock()
+
+    def acquire(self):
+        """
+        Take a buffer from the pool, allocating a new one if none is idle.
+
+        Returns:
+            ReceiveBuffer: An empty receive buffer.
+
+        Example:
+        >>> receive_buffer = pool.acquire()
+        """
+        with self._lock:
+            if self._idle:
+                self.reuses += 1
+                return self._idle.pop()
+            self.allocations += 1
+        return ReceiveBuffer(self.buffer_size)
+
+    def release(self, receive_buffer):
+        """
+        Return a buffer to the pool so that another connection can reuse it.
+
+        Args:
+            receive_buffer (ReceiveBuffer): The buffer to return.
+
+        Example:
+        >>> pool.release(receive_buffer)
+        """
+        receive_buffer.clear()
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(receive_buffer)
+
+class ReceiveBuffer:
+    """
+    A preallocated buffer holding the bytes received from a connection that have not been consumed yet.
+
+    Pending bytes are buffer[start:end]. Requests are located by index so that protocols can parse them
+    in place, and the indices stay valid until the next call to fill.
+
+    Attributes:
+        buffer (bytearray): The underlying storage.
+        view (memoryview): A view over the whole buffer, used to receive and move data without copies.
+        start (int): The index of the first pending byte.
+        end (int): The index after the last pending byte.
+    """
+
+    def __init__(self, size):
+        """
+        Initialize a ReceiveBuffer object with the given size.
+
+        Args:
+            size (int): The capacity of the buffer in bytes.
+        """
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+
+    @property
+    def pending(self):
+        """
+        int: The number of received bytes that have not been consumed.
+        """
+        return self.end - self.start
+
+    @property
+    def full(self):
+        """
+        bool: True if the pending bytes fill the whole buffer.
+        """
+        return self.pending == len(self.buffer)
+
+    def clear(self):
+        """
+        Discard all pending bytes.
+        """
+        self.start = 0
+        self.end = 0
+
+    def fill(self, conn):
+        """
+        Receive more data from the connection into the free space of the buffer.
+
+        Pending bytes are moved to the front of the buffer first if the free space at the end is exhausted.
+
+        Args:
+            conn (socket.socket): The connection to receive from.
+
+        Returns:
+            int: The number of bytes received, 0 if the connection was closed.
+
+        Example:
+        >>> count = receive_buffer.fill(client.conn)
+        """
+        if self.start == self.end:
+            self.clear()
+        elif self.end == len(self.buffer):
+            pending = self.pending
+            self.view[:pending] = self.view[self.start:self.end]
+            self.start, self.end = 0, pending
+        count = conn.recv_into(self.view[self.end:])
+        self.end += count
+        return count
+
+    def take(self, size):
+        """
+        Consume exactly size pending bytes.
+
+        Args:
+            size (int): The number of bytes to consume.
+
+        Returns:
+            tuple: The (start, end) indices of the consumed bytes, or None if fewer bytes are pending.
+        """
+        if self.pending < size:
+            return None
+        start = self.start
+        self.start += size
+        return start, self.start
+
+    def take_line(self):
+        """
+        Consume the pending bytes up to and including the next b"\\n".
+
+        Returns:
+            tuple: The (start, end) indices of the line, or None if no complete line is pending.
+        """
+        index = self.buffer.find(b"\n", self.start, self.end)
+        if index < 0:
+            return None
+        return self.take(index + 1 - self.start)
+
+    def take_all(self):
+        """
+        Consume all pending bytes.
+
+        Returns:
+            tuple: The (start, end) indices of the consumed bytes, or None if nothing is pending.
+        """
+        if not self.pending:
+            return None
+        return self.take(self.pending)
@@ -9,6 +9,12 @@ class Client:
         addr (tuple): A tuple containing the IP address and port of the client.
         timeout (float): The timeout value for the client's connection.
         request_timestamps (List[float]): A list of timestamps representing the times when requests were made.
+        receive_buffer (ReceiveBuffer): The buffer holding the data received from the client, set while it is served.
+        line_mode (bool): True once the client has delimited a request with a newline.
+        read_started (float): The monotonic time at which the request being received started, None between requests.
+        read_bytes (int): The number of bytes of the request being received that have arrived so far.
+        serving_started (float): The monotonic time at which a worker started serving the connection, None before.
+        first_request_received (bool): True once a complete request has been received from the client.
     """
 
     def __init__(self, conn, addr, timeout):
@@ -24,6 +30,12 @@ class Client:
         self.addr = addr
         self.timeout = timeout
         self.request_timestamps = []
+        self.receive_buffer = None
+        self.line_mode = False
+        self.read_started = None
+        self.read_bytes = 0
+        self.serving_started = None
+        self.first_request_received = False
 
     def check_request_limit(self, requests_per_minute):
         """
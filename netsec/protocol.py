@@ -0,0 +1,150 @@
+import struct
+from ipaddress import IPv4Address
+
+# Status codes shared by both protocols, sent as a single byte in binary mode
+STATUS_SUCCESS = 0
+STATUS_INVALID_INPUT = 1
+STATUS_OVERFLOW = 2
+STATUS_COMPUTATION_TIMEOUT = 3
+STATUS_ERROR = 4
+STATUS_REQUEST_LIMIT = 5
+STATUS_CLIENT_TIMEOUT = 6
+
+# Convert a field of a request held in a memoryview
+def _convert_field(convert, view):
+    try:
+        return convert(view)
+    except ValueError:
+        # Convert the decoded field again so that the error message shows its value
+        return convert(str(view, "utf-8").strip())
+
+class TextProtocol:
+    """
+    The original line-based protocol: "{i1} {i2} {i3} {i4}" in, a text message terminated by "\\r\\n" out.
+    """
+
+    @staticmethod
+    def parse_request(buffer, start=0, end=None):
+        """
+        Parse a text request into its four fields in place, without splitting the buffer into new strings.
+
+        Args:
+            buffer (bytes-like): The buffer holding the request.
+            start (int, optional): The index of the first byte of the request. Defaults to 0.
+            end (int, optional): The index after the last byte of the request. Defaults to the end of the buffer.
+
+        Returns:
+            tuple: The parsed values (i1, i2, i3, i4) as (float, float, str, int).
+
+        Raises:
+            ValueError: If the request does not contain four fields or a field cannot be converted.
+
+        Example:
+        >>> TextProtocol.parse_request(b"5 2 127.0.0.1 8081")
+        (5.0, 2.0, '127.0.0.1', 8081)
+        """
+        if end is None:
+            end = len(buffer)
+        if buffer.count(b" ", start, end) != 3:
+            raise ValueError("Incorrect number of input arguments")
+
+        view = memoryview(buffer)
+        first = buffer.find(b" ", start, end)
+        second = buffer.find(b" ", first + 1, end)
+        third = buffer.find(b" ", second + 1, end)
+        i1 = _convert_field(float, view[start:first])
+        i2 = _convert_field(float, view[first + 1:second])
+        i3 = str(view[second + 1:third], "utf-8").strip()
+        i4 = _convert_field(int, view[third + 1:end])
+        return i1, i2, i3, i4
+
+    @staticmethod
+    def encode_response(status, message):
+        """
+        Encode a response for a text client.
+
+        Args:
+            status (int): The status code of the response, unused by the text protocol.
+            message (str): The human-readable message to send.
+
+        Returns:
+            bytes: The encoded response.
+
+        Example:
+        >>> TextProtocol.encode_response(STATUS_SUCCESS, "Success")
+        b'Success\\r\\n'
+        """
+        return f"{message}\r\n".encode()
+
+class BinaryProtocol:
+    """
+    A compact fixed-size protocol negotiated by sending MAGIC as the first byte of the connection.
+
+    Each request is REQUEST.size bytes in network byte order: i1 and i2 as doubles, i3 as an IPv4 address
+    packed in an unsigned 32-bit integer and i4 as an unsigned 16-bit integer. Each response is a single
+    status byte.
+    """
+
+    MAGIC = b"\xb1"
+    REQUEST = struct.Struct("!ddIH")
+    RESPONSE = struct.Struct("!B")
+
+    @staticmethod
+    def parse_request(buffer, start=0, end=None):
+        """
+        Parse a binary request directly from a receive buffer.
+
+        Args:
+            buffer (bytes-like): The buffer holding at least REQUEST.size bytes from start.
+            start (int, optional): The index of the first byte of the request. Defaults to 0.
+            end (int, optional): The index after the last byte of the request, unused as requests have a fixed size.
+
+        Returns:
+            tuple: The parsed values (i1, i2, i3, i4) as (float, float, str, int).
+
+        Raises:
+            struct.error: If the buffer is too short to hold a request.
+
+        Example:
+        >>> BinaryProtocol.parse_request(BinaryProtocol.pack_request(5.0, 2.0, "127.0.0.1", 8081))
+        (5.0, 2.0, '127.0.0.1', 8081)
+        """
+        i1, i2, i3, i4 = BinaryProtocol.REQUEST.unpack_from(buffer, start)
+        return i1, i2, str(IPv4Address(i3)), i4
+
+    @staticmethod
+    def pack_request(i1, i2, i3, i4):
+        """
+        Pack a binary request, as sent by a binary client.
+
+        Args:
+            i1 (float): The first input value.
+            i2 (float): The second input value.
+            i3 (str): The IPv4 address of the target end server.
+            i4 (int): The port number of the target end server.
+
+        Returns:
+            bytes: The packed request.
+
+        Example:
+        >>> BinaryProtocol.pack_request(5.0, 2.0, "127.0.0.1", 8081)
+        """
+        return BinaryProtocol.REQUEST.pack(i1, i2, int(IPv4Address(i3)), i4)
+
+    @staticmethod
+    def encode_response(status, message):
+        """
+        Encode a response for a binary client.
+
+        Args:
+            status (int): The status code of the response.
+            message (str): The human-readable message, unused by the binary protocol.
+
+        Returns:
+            bytes: The single status byte.
+
+        Example:
+        >>> BinaryProtocol.encode_response(STATUS_SUCCESS, "Success")
+        b'\\x00'
+        """
+        return BinaryProtocol.RESPONSE.pack(status)
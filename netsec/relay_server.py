@@ -1,9 +1,17 @@
 import socket
 import logging
+import ssl
+import time
+from collections import Counter
 from concurrent.futures import ThreadPoolExecutor
-from threading import Timer, Lock
+from threading import Event, Lock
+from netsec.buffers import BufferPool
 from netsec.client import Client
+from netsec.protocol import (TextProtocol, BinaryProtocol, STATUS_SUCCESS, STATUS_INVALID_INPUT, STATUS_OVERFLOW,
+                             STATUS_COMPUTATION_TIMEOUT, STATUS_ERROR, STATUS_REQUEST_LIMIT, STATUS_CLIENT_TIMEOUT)
+from netsec.resolver import Resolver
 from netsec.sanitizer import Sanitizer
+from netsec.spool import Spool
 from netsec.utils import timeout
 
 class RelayServer:
@@ -17,12 +25,26 @@ class RelayServer:
         client_timeout (float): Time (in seconds) before a client is disconnected due to inactivity.
         response_timeout (float): Time (in seconds) before a request is considered failed.
         requests_per_minute (int): Limit on the number of requests per minute.
+        buffer_size (int, optional): Size (in bytes) of the receive buffer of each connection. Defaults to 4096.
+        spool_directory (str, optional): Directory of the write-behind spool. If set, validated requests are
+            stored in the spool and acknowledged immediately, then delivered to the end server in the background.
+            Defaults to None, which sends each request to the end server before acknowledging it.
+        spool_segment_size (int, optional): Size (in bytes) of each spool segment file. Defaults to 1048576.
+        read_deadline (float, optional): Time (in seconds) a client has to send the rest of a request once its
+            first byte arrived. Defaults to 10.0.
+        min_read_rate (float, optional): Minimum average rate (in bytes per second) at which a client must send a
+            request that takes more than a second to arrive. Defaults to 32.
+        max_line_length (int, optional): Maximum length (in bytes) of a text request. Defaults to 1024.
+        resolver (Resolver, optional): Resolver of end server host names. Defaults to a Resolver using the
+            system resolver.
 
     Example:
     >>> relay_server = RelayServer("127.0.0.1", 8080, 10, 60.0, 10.0, 60)
     """
 
-    def __init__(self, ip_address, port, max_clients, client_timeout, response_timeout, requests_per_minute):
+    def __init__(self, ip_address, port, max_clients, client_timeout, response_timeout, requests_per_minute,
+                 buffer_size=4096, spool_directory=None, spool_segment_size=1048576, read_deadline=10.0,
+                 min_read_rate=32, max_line_length=1024, resolver=None):
         self.ip_address = ip_address
         self.port = port
         self.server_socket = None
@@ -30,27 +52,88 @@ class RelayServer:
         self.client_timeout = client_timeout
         self.response_timeout = response_timeout
         self.requests_per_minute = requests_per_minute
+        self.read_deadline = read_deadline
+        self.min_read_rate = min_read_rate
+        self.max_line_length = min(max_line_length, buffer_size)
+        self.buffer_size = buffer_size
+        self.resolver = resolver or Resolver()
+        self.buffer_pool = BufferPool(buffer_size, max_clients)
+        self.spool = None
+        if spool_directory:
+            self.spool = Spool(spool_directory, spool_segment_size, self._deliver)
         self.current_clients = 0
         self.lock = Lock()
+        self.stopping = Event()
+        self.disconnects = Counter()
+        self.handshakes = Counter()
         logging.info(f"RelayServer initialized with ip_address: {ip_address}, port: {port}, max_clients: {max_clients}, "
                      f"client_timeout: {client_timeout}, response_timeout: {response_timeout}, "
-                     f"requests_per_minute: {requests_per_minute}")
+                     f"requests_per_minute: {requests_per_minute}, buffer_size: {buffer_size}, "
+                     f"spool_directory: {spool_directory}, spool_segment_size: {spool_segment_size}, "
+                     f"read_deadline: {read_deadline}, min_read_rate: {min_read_rate}, max_line_length: {max_line_length}")
+
+    def apply_limits(self, max_clients, client_timeout, response_timeout, requests_per_minute, read_deadline,
+                     min_read_rate, max_line_length):
+        """
+        Apply new limits to the running RelayServer without restarting it.
+
+        The new values take effect for the next accepted connection, inactivity timer and request. Connections
+        above a lowered max_clients are not closed, but no new ones are accepted until enough of them end.
+
+        Args:
+            max_clients (int): Maximum number of allowed clients.
+            client_timeout (float): Time (in seconds) before a client is disconnected due to inactivity.
+            response_timeout (float): Time (in seconds) before a request is considered failed.
+            requests_per_minute (int): Limit on the number of requests per minute.
+            read_deadline (float): Time (in seconds) a client has to send the rest of a request.
+            min_read_rate (float): Minimum average rate (in bytes per second) at which a client must send a request.
+            max_line_length (int): Maximum length (in bytes) of a text request.
+
+        Example:
+        >>> relay_server.apply_limits(20, 60.0, 10.0, 120, 10.0, 32, 1024)
+        """
+        with self.lock:
+            self.max_clients = max_clients
+            self.client_timeout = client_timeout
+            self.response_timeout = response_timeout
+            self.requests_per_minute = requests_per_minute
+            self.read_deadline = read_deadline
+            self.min_read_rate = min_read_rate
+            self.max_line_length = min(max_line_length, self.buffer_size)
+            self.buffer_pool.max_idle = max_clients
+        logging.info(f"RelayServer limits applied with max_clients: {max_clients}, client_timeout: {client_timeout}, "
+                     f"response_timeout: {response_timeout}, requests_per_minute: {requests_per_minute}, "
+                     f"read_deadline: {read_deadline}, min_read_rate: {min_read_rate}, max_line_length: {max_line_length}")
+
+    def stop(self):
+        """
+        Stop accepting connections and let start return once the connected clients are done.
+
+        The listening socket is closed in this process only, so a process that inherited it keeps accepting.
+
+        Example:
+        >>> relay_server.stop()
+        """
+        logging.info(f"Relay server at {self.ip_address}:{self.port} stopping, draining {self.current_clients} connections")
+        self.stopping.set()
 
     @timeout()
     def send_data_to_end_server(self, o1, o2, i3, i4, timeout=None):
         """
         Send data to the end server.
 
-        Connect to the IP address and port specified by i3 and i4, respectively, and send the data o1, o2, i3, and i4 in the format "{o1} {o2} {i3} {i4}\r\n".
+        Connect to the host and port specified by i3 and i4, respectively, and send the data o1, o2, i3, and i4 in the format "{o1} {o2} {i3} {i4}\r\n".
+        Host names are resolved through the server's resolver cache.
 
         Args:
             o1 (float): The result of I1 / I2.
             o2 (int): The result of I1 ** I2.
-            i3 (str): The IP address of the target end server.
+            i3 (str): The IP address or host name of the target end server.
             i4 (int): The port number of the target end server.
             timeout (int): The number of seconds to wait before timing out the function call. If not specified, the default timeout value is used.
 
         Raises:
+            OSError: If the host name of the end server cannot be resolved.
             Exception: If there is an error while sending the data to the end server.
             TimeoutError: If the computation takes more than the specified number of seconds to complete.
 
@@ -60,14 +143,221 @@ class RelayServer:
         """
         logging.info(f"Sending data to end server at {i3}:{i4}: {o1} {o2} {i3} {i4}")
         try:
+            address = self.resolver.resolve(i3)
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-                sock.connect((i3, i4))
+                sock.connect((address, i4))
                 sock.sendall(f"{o1} {o2} {i3} {i4}\r\n".encode())
                 logging.info(f"Data sent to the end server at {i3}:{i4}: {o1} {o2} {i3} {i4}")
         except Exception as e:
             logging.error(f"Error while sending data to end server: {e}")
             raise
 
+    # Deliver a record from the write-behind spool to its end server
+    def _deliver(self, o1, o2, i3, i4):
+        """
+        Send a spooled record to the end server, used by the spool's background senders.
+
+        Args:
+            o1 (float): The result of I1 / I2.
+            o2 (float): The result of I1 ** I2.
+            i3 (str): The IP address or host name of the target end server.
+            i4 (int): The port number of the target end server.
+
+        Raises:
+            Exception: If there is an error while sending the data to the end server.
+            TimeoutError: If sending takes more than response_timeout seconds.
+        """
+        self.send_data_to_end_server(o1, o2, i3, i4, timeout=self.response_timeout)
+
+    # Detect which protocol the client speaks from the first byte of the connection
+    def _negotiate_protocol(self, client):
+        """
+        Select the protocol for the given client.
+
+        Binary clients announce themselves with BinaryProtocol.MAGIC as the first byte, which is consumed.
+        Any other first byte, including those sent by existing text clients, selects the text protocol.
+
+        Args:
+            client (Client): The client whose protocol needs to be selected.
+
+        Returns:
+            type: TextProtocol or BinaryProtocol.
+
+        Raises:
+            TimeoutError: If the client stayed inactive for client_timeout seconds.
+
+        Example:
+        >>> protocol = relay_server._negotiate_protocol(client)
+        """
+        receive_buffer = client.receive_buffer
+        magic = BinaryProtocol.MAGIC
+        while receive_buffer.pending < len(magic):
+            if not self._receive(client):
+                return TextProtocol
+        if receive_buffer.buffer.startswith(magic, receive_buffer.start):
+            receive_buffer.take(len(magic))
+            logging.info(f"Binary protocol negotiated with client {client.addr}")
+            return BinaryProtocol
+        return TextProtocol
+
+    # Disconnect a client that exceeded its read budget
+    def _abort(self, reason, message):
+        """
+        Count a client disconnection for the given reason and abort the connection.
+
+        Args:
+            reason (str): The key of the disconnection in the disconnects counter.
+            message (str): The description of the disconnection.
+
+        Raises:
+            ConnectionAbortedError: Always.
+        """
+        with self.lock:
+            self.disconnects[reason] += 1
+        raise ConnectionAbortedError(message)
+
+    # Receive more data from a client within its read budget
+    def _receive(self, client):
+        """
+        Receive more data into the given client's receive buffer, enforcing the client's read budget.
+
+        Between requests, the client may stay silent for client_timeout seconds. Once the first byte of a request
+        has arrived, the rest of it must arrive within read_deadline seconds and, after the first second, at an
+        average of at least min_read_rate bytes per second. The first request of a connection must arrive within
+        read_deadline seconds of a worker starting to serve it, so that clients connecting without sending
+        anything cannot hold on to the server's connection slots.
+
+        Args:
+            client (Client): The client to receive from.
+
+        Returns:
+            int: The number of bytes received, 0 if the client closed the connection.
+
+        Raises:
+            TimeoutError: If the client stayed inactive for client_timeout seconds.
+            ConnectionAbortedError: If the client sent a request too slowly, or no first request in time.
+
+        Example:
+        >>> count = relay_server._receive(client)
+        """
+        receive_buffer = client.receive_buffer
+        if not receive_buffer.pending:
+            client.read_started = None
+        deadline_started = client.read_started
+        if deadline_started is None and not client.first_request_received:
+            deadline_started = client.serving_started
+        timeout = self.client_timeout
+        if deadline_started is not None:
+            remaining = self.read_deadline - (time.monotonic() - deadline_started)
+            if remaining <= 0:
+                self._abort("read_deadline", f"Request not complete within {self.read_deadline} seconds")
+            timeout = min(timeout, remaining)
+
+        client.conn.settimeout(timeout)
+        try:
+            count = receive_buffer.fill(client.conn)
+        except socket.timeout:
+            if deadline_started is not None and timeout < self.client_timeout:
+                self._abort("read_deadline", f"Request not complete within {self.read_deadline} seconds")
+            with self.lock:
+                self.disconnects["inactive"] += 1
+            raise TimeoutError(f"No data received for {self.client_timeout} seconds")
+
+        if client.read_started is None:
+            client.read_started = time.monotonic()
+            client.read_bytes = count
+            return count
+        client.read_bytes += count
+        elapsed = time.monotonic() - client.read_started
+        if count and elapsed >= 1.0 and client.read_bytes / elapsed < self.min_read_rate:
+            self._abort("min_read_rate", f"Request sent at {client.read_bytes / elapsed:.1f} bytes per second")
+        return count
+
+    # Complete the TLS handshake of a client, off the accept loop
+    def _handshake(self, client):
+        """
+        Perform the TLS handshake with the given client within read_deadline seconds of a worker starting to
+        serve it, a deadline that also covers the first request.
+
+        Full and resumed handshakes are counted separately in the handshakes counter.
+
+        Args:
+            client (Client): The client whose connection is an ssl.SSLSocket that has not done its handshake.
+
+        Raises:
+            ConnectionAbortedError: If the handshake failed or did not complete in time.
+
+        Example:
+        >>> relay_server._handshake(client)
+        """
+        remaining = self.read_deadline - (time.monotonic() - client.serving_started)
+        if remaining <= 0:
+            self._abort("tls_handshake", f"TLS handshake not complete within {self.read_deadline} seconds")
+        client.conn.settimeout(remaining)
+        try:
+            client.conn.do_handshake()
+        except socket.timeout:
+            self._abort("tls_handshake", f"TLS handshake not complete within {self.read_deadline} seconds")
+        except (ssl.SSLError, OSError) as e:
+            self._abort("tls_handshake", f"TLS handshake failed: {e}")
+        kind = "resumed" if client.conn.session_reused else "full"
+        with self.lock:
+            self.handshakes[kind] += 1
+        logging.debug(f"TLS handshake {kind} with client {client.addr} using {client.conn.version()} {client.conn.cipher()[0]}")
+
+    # Locate the next complete request in the client's receive buffer, receiving more data as needed
+    def _next_request(self, client, protocol):
+        """
+        Return the position of the next request from the given client within its receive buffer.
+
+        Binary requests are frames of BinaryProtocol.REQUEST.size bytes. Text requests end with b"\n";
+        clients that have never sent one get the existing behaviour where everything received by a single
+        recv is one request.
+
+        Args:
+            client (Client): The client to receive from.
+            protocol (type): TextProtocol or BinaryProtocol.
+
+        Returns:
+            tuple: The (start, end) indices of the request in client.receive_buffer.buffer, or None if the
+                client closed the connection.
+
+        Raises:
+            TimeoutError: If the client stayed inactive for client_timeout seconds.
+            ConnectionAbortedError: If the client sent a request too slowly or a text request longer than
+                max_line_length.
+
+        Example:
+        >>> start, end = relay_server._next_request(client, TextProtocol)
+        """
+        receive_buffer = client.receive_buffer
+        # Bytes left over from protocol negotiation were received by a recv whose data is not yet framed
+        received = receive_buffer.pending > 0
+        # Bytes left over from the previous request start its read budget now, so that the time spent serving
+        # the previous request is not held against the client
+        if received:
+            client.read_started = time.monotonic()
+            client.read_bytes = receive_buffer.pending
+        while True:
+            if protocol is BinaryProtocol:
+                request = receive_buffer.take(BinaryProtocol.REQUEST.size)
+            else:
+                request = receive_buffer.take_line()
+                if request is not None:
+                    client.line_mode = True
+                elif received and not client.line_mode:
+                    request = receive_buffer.take_all()
+            if request is not None and request[1] - request[0] > self.max_line_length:
+                self._abort("line_too_long", f"Request longer than {self.max_line_length} bytes")
+            if request is not None:
+                client.first_request_received = True
+                return request
+            if receive_buffer.full or receive_buffer.pending > self.max_line_length:
+                self._abort("line_too_long", f"Request longer than {self.max_line_length} bytes")
+            if not self._receive(client):
+                return None
+            received = True
+
     # Process the request from a client, handle input validation, send data to end server, and handle errors
     def _process_request(self, client):
         """
@@ -88,7 +378,7 @@ class RelayServer:
         def close_connection(timeout=False):
             try:
                 if timeout:
-                    client.conn.sendall("Timeout\r\n".encode())
+                    client.conn.sendall(protocol.encode_response(STATUS_CLIENT_TIMEOUT, "Timeout"))
                     logging.warning(f"Client timed out: {client.addr}")
             except OSError as e:
                 logging.error(f"Error while sending data to client: {e}")
@@ -97,63 +387,88 @@ class RelayServer:
                 self.current_clients -= 1
                 logging.info(f"Connection closed for {client.addr}")
 
-        # Start a timer to manage client inactivity timeouts
-        def start_client_timer():
-            timer = Timer(self.client_timeout, lambda: close_connection(timeout=True))
-            timer.start()
-            return timer
-
         addr = client.addr
         logging.info(f"Connection accepted from {addr}")
-        while True:
-            client_timer = start_client_timer()
-            try:
-                data = client.conn.recv(1024)
-                logging.debug(f"Data received from client {addr}: {data}")
-                if client.check_request_limit(self.requests_per_minute):
-                    client.conn.sendall("Request limit reached, try again later.\r\n".encode())
-                    logging.warning(f"Request limit reached for client {addr}")
+        # The first request's deadline starts here rather than at accept, so that time spent waiting for a free
+        # worker is not held against the client
+        client.serving_started = time.monotonic()
+        protocol = TextProtocol
+        timed_out = False
+        client.receive_buffer = self.buffer_pool.acquire()
+        try:
+            if isinstance(client.conn, ssl.SSLSocket):
+                self._handshake(client)
+            protocol = self._negotiate_protocol(client)
+            while True:
+                request = self._next_request(client, protocol)
+                if request is None:
+                    logging.info(f"Connection closed by client {addr}")
                     break
-                client_timer.cancel()
-                split_data = data.decode().split(" ")
-                if len(split_data) != 4:
-                    raise ValueError("Incorrect number of input arguments")
-
-                i1, i2, i3, i4 = map(str.strip, split_data)
-                i1, i2, i4 = float(i1), float(i2), int(i4)
+                start, end = request
+                logging.debug(f"Request of {end - start} bytes received from client {addr}")
+                response = None
+                try:
+                    if client.check_request_limit(self.requests_per_minute):
+                        client.conn.sendall(protocol.encode_response(STATUS_REQUEST_LIMIT, "Request limit reached, try again later."))
+                        logging.warning(f"Request limit reached for client {addr}")
+                        break
+                    i1, i2, i3, i4 = protocol.parse_request(client.receive_buffer.buffer, start, end)
 
-                Sanitizer.validate_ip(i3)
-                Sanitizer.validate_port(i4)
+                    Sanitizer.validate_host(i3)
+                    Sanitizer.validate_port(i4)
                 
-                o1, o2 = Sanitizer.validate_input(i1, i2)
-                self.send_data_to_end_server(o1, o2, i3, i4, timeout=self.response_timeout)
-                response = "Success\r\n"
-                logging.info(f"Successfully processed request for client {addr}")
-            except ValueError as e:
-                response = f"Invalid input value: {e}\r\n"
-                logging.error(f"Invalid input value from {addr}: {e}")
-            except OverflowError as e:
-                response = f"Overflow error: {e}\r\n"
-                logging.error(f"Overflow error from {addr}: {e}")
-            except TimeoutError as e:
-                response = f"Computation timeout error: {e}\r\n"
-                logging.error(f"Computation timeout error from {addr}: {e}")
-            except BrokenPipeError:
-                logging.error(f"Broken pipe error while sending data to client {addr}: connection closed by client.")
-            except Exception as e:
-                response = f"Error while processing request: {e}\r\n"
-                logging.error(f"Error while processing request from {addr}: {e}")
-            finally:
-                client.conn.sendall(response.encode())
-
-        client_timer.cancel()
-        close_connection(timeout=True)
+                    o1, o2 = Sanitizer.validate_input(i1, i2)
+                    if self.spool:
+                        self.spool.append(o1, o2, i3, i4)
+                    else:
+                        self.send_data_to_end_server(o1, o2, i3, i4, timeout=self.response_timeout)
+                    response = protocol.encode_response(STATUS_SUCCESS, "Success")
+                    logging.info(f"Successfully processed request for client {addr}")
+                except ValueError as e:
+                    response = protocol.encode_response(STATUS_INVALID_INPUT, f"Invalid input value: {e}")
+                    logging.error(f"Invalid input value from {addr}: {e}")
+                except OverflowError as e:
+                    response = protocol.encode_response(STATUS_OVERFLOW, f"Overflow error: {e}")
+                    logging.error(f"Overflow error from {addr}: {e}")
+                except TimeoutError as e:
+                    response = protocol.encode_response(STATUS_COMPUTATION_TIMEOUT, f"Computation timeout error: {e}")
+                    logging.error(f"Computation timeout error from {addr}: {e}")
+                except BrokenPipeError:
+                    logging.error(f"Broken pipe error while sending data to client {addr}: connection closed by client.")
+                except Exception as e:
+                    response = protocol.encode_response(STATUS_ERROR, f"Error while processing request: {e}")
+                    logging.error(f"Error while processing request from {addr}: {e}")
+                finally:
+                    if response:
+                        client.conn.sendall(response)
+        except TimeoutError:
+            timed_out = True
+        except ConnectionAbortedError as e:
+            logging.warning(f"Client disconnected: {addr}: {e}, disconnections so far: {dict(self.disconnects)}")
+        except OSError as e:
+            logging.error(f"Error while receiving data from client {addr}: {e}")
+        finally:
+            close_connection(timeout=timed_out)
+            self.buffer_pool.release(client.receive_buffer)
+            logging.debug(f"Receive buffer released, {self.buffer_pool.allocations} allocated and "
+                          f"{self.buffer_pool.reuses} reused so far")
 
-    def start(self):
+    def start(self, listen_fd=None, tls_context=None, on_ready=None):
         """
         Start the RelayServer.
 
-        Accept incoming connections, manage connection limits, and process client requests.
+        Accept incoming connections, manage connection limits, and process client requests until stop is called,
+        then wait for the connected clients to finish.
+
+        Args:
+            listen_fd (int, optional): File descriptor of a listening socket inherited from the process being
+                upgraded. Defaults to None, which binds a new socket to ip_address and port.
+            tls_context (ssl.SSLContext, optional): Server-side TLS context, see netsec.tls.create_server_context.
+                If set, every connection is wrapped in TLS and its handshake is done by the worker serving it, so
+                that a burst of handshakes does not stall the accept loop. Defaults to None, which uses plain TCP.
+            on_ready (Callable, optional): Called without arguments once the listening socket is set up and the
+                server is about to accept connections, for example to tell the process being upgraded that it can
+                stop. Not called if the socket cannot be set up. Defaults to None.
 
         Raises:
             PermissionError: If privileged access is required to bind the address.
@@ -165,36 +480,60 @@ class RelayServer:
         Sanitizer.validate_ip(self.ip_address)
         Sanitizer.validate_port(self.port)
 
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
-            try:
-                server_socket.bind((self.ip_address, self.port))
-            except PermissionError as e:
-                error_msg = f"Permission error, privileged access required to bind the address {self.ip_address}:{self.port}: {e}"
-                logging.error(f"Permission error, privileged access required to bind the address {self.ip_address}:{self.port}: {e}")
-                print(error_msg)
-                return
-            except OSError as e:
-                error_msg = f"Error while binding the address {self.ip_address}:{self.port}: {e}"
-                logging.error(f"Error while binding the address {self.ip_address}:{self.port}: {e}")
-                print(error_msg)
-                return
+        if listen_fd is None:
+            server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        else:
+            server_socket = socket.socket(fileno=listen_fd)
 
-            
-            server_socket.listen(self.max_clients)
+        with server_socket:
+            if listen_fd is None:
+                try:
+                    server_socket.bind((self.ip_address, self.port))
+                except PermissionError as e:
+                    error_msg = f"Permission error, privileged access required to bind the address {self.ip_address}:{self.port}: {e}"
+                    logging.error(f"Permission error, privileged access required to bind the address {self.ip_address}:{self.port}: {e}")
+                    print(error_msg)
+                    return
+                except OSError as e:
+                    error_msg = f"Error while binding the address {self.ip_address}:{self.port}: {e}"
+                    logging.error(f"Error while binding the address {self.ip_address}:{self.port}: {e}")
+                    print(error_msg)
+                    return
+
+                server_socket.listen(self.max_clients)
+                logging.info(f"Relay server started at {self.ip_address}:{self.port}{' with TLS' if tls_context else ''}")
+            else:
+                if not server_socket.getsockopt(socket.SOL_SOCKET, socket.SO_ACCEPTCONN):
+                    raise OSError(f"Inherited socket {listen_fd} is not listening")
+                logging.info(f"Relay server started at {self.ip_address}:{self.port} on inherited socket {listen_fd}")
             self.server_socket = server_socket
-            logging.info(f"Relay server started at {self.ip_address}:{self.port}")
+            # Wake up regularly to notice when the server is stopping
+            server_socket.settimeout(1.0)
+            if on_ready:
+                on_ready()
 
             # Use ThreadPoolExecutor to handle multiple client connections concurrently
             with ThreadPoolExecutor() as executor:
-                while True:
-                    conn, addr = server_socket.accept()
+                while not self.stopping.is_set():
+                    try:
+                        conn, addr = server_socket.accept()
+                    except socket.timeout:
+                        continue
                     logging.debug(f"Connection attempt from {addr}")
                     if self.current_clients < self.max_clients:
                         self.current_clients += 1
+                        if tls_context:
+                            conn = tls_context.wrap_socket(conn, server_side=True, do_handshake_on_connect=False)
                         client = Client(conn, addr, self.client_timeout)
                         executor.submit(self._process_request, client)
                         logging.info(f"Accepted connection from {addr} and submitted for processing")
                     else:
-                        conn.sendall("Connection limit reached, try again later.\r\n".encode())
+                        # A TLS client cannot read the message before a handshake, which is not worth doing here
+                        if not tls_context:
+                            conn.sendall("Connection limit reached, try again later.\r\n".encode())
                         conn.close()
                         logging.warning(f"Connection limit reached, denied connection from {addr}")
+
+        if self.spool:
+            self.spool.close()
+        logging.info(f"Relay server at {self.ip_address}:{self.port} stopped")
@@ -0,0 +1,197 @@
+import copy
+import logging
+import socket
+import time
+from ipaddress import AddressValueError, IPv4Address
+from threading import Event, Lock
+
+# Look up the IPv4 addresses of a host name with the system resolver
+def getaddrinfo_lookup(name):
+    """
+    Look up the IPv4 addresses of the given host name with socket.getaddrinfo.
+
+    Args:
+        name (str): The host name to look up.
+
+    Returns:
+        List[str]: The IPv4 addresses of the host, in the order returned by the system resolver.
+
+    Raises:
+        socket.gaierror: If the host name cannot be resolved.
+
+    Example:
+    >>> getaddrinfo_lookup("localhost")
+    ['127.0.0.1']
+    """
+    addresses = []
+    for family, type, proto, canonname, sockaddr in socket.getaddrinfo(name, None, socket.AF_INET, socket.SOCK_STREAM):
+        if sockaddr[0] not in addresses:
+            addresses.append(sockaddr[0])
+    return addresses
+
+class HostsFileLookup:
+    """
+    Look up host names in a file in the hosts(5) format instead of asking the system resolver.
+
+    Attributes:
+        path (str): The path of the hosts file.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize a HostsFileLookup object with the given hosts file.
+
+        Args:
+            path (str): The path of the hosts file.
+        """
+        self.path = path
+
+    def __call__(self, name):
+        """
+        Look up the IPv4 addresses of the given host name in the hosts file.
+
+        The file is read on every call, so that changes to it are seen once cached entries expire.
+
+        Args:
+            name (str): The host name to look up.
+
+        Returns:
+            List[str]: The IPv4 addresses of the host, in the order they appear in the file.
+
+        Raises:
+            socket.gaierror: If the host name is not in the file.
+
+        Example:
+        >>> HostsFileLookup("hosts")("end-server.local")
+        ['10.0.0.5']
+        """
+        addresses = []
+        with open(self.path) as f:
+            for line in f:
+                fields = line.split("#", 1)[0].split()
+                if len(fields) < 2 or name.lower() not in (alias.lower() for alias in fields[1:]):
+                    continue
+                try:
+                    address = str(IPv4Address(fields[0]))
+                except AddressValueError:
+                    continue
+                if address not in addresses:
+                    addresses.append(address)
+        if not addresses:
+            raise socket.gaierror(socket.EAI_NONAME, f"Name not found in {self.path}: {name}")
+        return addresses
+
+class Resolver:
+    """
+    Resolve end server host names to IPv4 addresses through an in-process cache.
+
+    Successful lookups are cached for ttl seconds and failed ones for negative_ttl seconds. Concurrent lookups of
+    the same name are collapsed into a single call to the lookup function, whose result is shared by all callers.
+
+    Attributes:
+        lookup (Callable): The function called with a host name, returning its IPv4 addresses or raising OSError.
+        ttl (float): Time (in seconds) a successful lookup is cached.
+        negative_ttl (float): Time (in seconds) a failed lookup is cached.
+        max_entries (int): The maximum number of cached host names.
+    """
+
+    def __init__(self, lookup=getaddrinfo_lookup, ttl=60.0, negative_ttl=10.0, max_entries=1024):
+        """
+        Initialize a Resolver object with the given parameters.
+
+        Args:
+            lookup (Callable, optional): The function called with a host name, returning its IPv4 addresses or
+                raising OSError. Defaults to getaddrinfo_lookup.
+            ttl (float, optional): Time (in seconds) a successful lookup is cached. Defaults to 60.0.
+            negative_ttl (float, optional): Time (in seconds) a failed lookup is cached. Defaults to 10.0.
+            max_entries (int, optional): The maximum number of cached host names. Defaults to 1024.
+        """
+        self.lookup = lookup
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._cache = {}
+        self._lookups = {}
+        self._lock = Lock()
+
+    def resolve(self, host):
+        """
+        Return an IPv4 address for the given host.
+
+        IPv4 addresses are returned as they are. Host names are answered from the cache, or looked up once for
+        all the callers that ask for them while the lookup is running.
+
+        Args:
+            host (str): An IPv4 address or a host name.
+
+        Returns:
+            str: The IPv4 address to connect to.
+
+        Raises:
+            OSError: If the host name cannot be resolved, raised again while the failure is cached.
+
+        Example:
+        >>> resolver.resolve("localhost")
+        '127.0.0.1'
+        """
+        try:
+            return str(IPv4Address(host))
+        except AddressValueError:
+            pass
+
+        name = host.lower()
+        with self._lock:
+            entry = self._cache.get(name)
+            if entry is not None and entry[0] > time.monotonic():
+                return self._result(entry[1])
+            pending = self._lookups.get(name)
+            leader = pending is None
+            if leader:
+                pending = self._lookups[name] = [Event(), None]
+
+        if not leader:
+            pending[0].wait()
+            return self._result(pending[1])
+
+        try:
+            result = self.lookup(name)
+            if not result:
+                raise socket.gaierror(socket.EAI_NONAME, f"No IPv4 address found for {name}")
+            ttl = self.ttl
+            logging.info(f"Resolved {name} to {result}")
+        except Exception as e:
+            # Cache the failure without the frames of this lookup
+            result = e.with_traceback(None)
+            ttl = self.negative_ttl
+            logging.error(f"Error while resolving {name}: {e}")
+        with self._lock:
+            self._cache.pop(name, None)
+            if len(self._cache) >= self.max_entries:
+                self._evict()
+            self._cache[name] = (time.monotonic() + ttl, result)
+            del self._lookups[name]
+        pending[1] = result
+        pending[0].set()
+        return self._result(result)
+
+    def _evict(self):
+        """
+        Drop the expired entries of the cache, then the oldest ones if it is still full.
+        """
+        now = time.monotonic()
+        for name in [name for name, entry in self._cache.items() if entry[0] <= now]:
+            del self._cache[name]
+        while len(self._cache) >= self.max_entries:
+            del self._cache[next(iter(self._cache))]
+
+    @staticmethod
+    def _result(result):
+        """
+        Return the first address of a lookup result, or raise a copy of the error of a failed lookup.
+
+        Each caller gets its own copy, so that concurrent callers do not share a traceback that grows every time
+        the cached error is raised.
+        """
+        if isinstance(result, Exception):
+            raise copy.copy(result)
+        return result[0]
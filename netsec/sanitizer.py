@@ -1,7 +1,10 @@
 import math
+import re
 from ipaddress import AddressValueError, IPv4Address
 from netsec.utils import timeout
 
+HOSTNAME_LABEL = re.compile(r"(?!-)[A-Za-z0-9-]{1,63}(?<!-)")
+
 class Sanitizer:
     @staticmethod
     def validate_ip(ip, check_specific_ips=False):
@@ -26,6 +29,44 @@ class Sanitizer:
         except AddressValueError as e:
             raise ValueError(f"Invalid IP address: {ip}")
 
+    @staticmethod
+    def validate_hostname(hostname):
+        """
+        Validate the given host name.
+
+        Args:
+            hostname (str): The host name to validate, made of dot-separated labels of letters, digits and hyphens.
+
+        Raises:
+            ValueError: If the host name is too long, has an invalid label or a numeric top-level label.
+
+        Example:
+        >>> Sanitizer.validate_hostname("end-server.example.com")
+        """
+        labels = hostname[:-1].split(".") if hostname.endswith(".") else hostname.split(".")
+        if (len(hostname) > 253 or not all(HOSTNAME_LABEL.fullmatch(label) for label in labels)
+                or labels[-1].isdigit()):
+            raise ValueError(f"Invalid host name: {hostname}")
+
+    @staticmethod
+    def validate_host(host):
+        """
+        Validate the given end server host, either an IPv4 address or a host name.
+
+        Args:
+            host (str): The host to validate.
+
+        Raises:
+            ValueError: If the host is neither a valid IPv4 address nor a valid host name.
+
+        Example:
+        >>> Sanitizer.validate_host("end-server.example.com")
+        """
+        try:
+            Sanitizer.validate_ip(host)
+        except ValueError:
+            Sanitizer.validate_hostname(host)
+
     @staticmethod
     def validate_port(port):
         """
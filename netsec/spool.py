@@ -0,0 +1,408 @@
+import heapq
+import logging
+import mmap
+import os
+import struct
+import time
+from collections import deque
+from itertools import count
+from threading import Condition, Lock, Thread
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class Segment:
+    """
+    A fixed-size spool file mapped in memory, holding a sequence of records.
+
+    The segment file is locked while it is open, so that a process taking over from another one during an
+    upgrade does not deliver the records of the segments the other process is still using.
+
+    Each record is a RECORD_HEADER (payload length, state) followed by the payload. A length of zero marks the
+    end of the records, as segments are preallocated with zeros.
+
+    Attributes:
+        path (str): The path of the segment file.
+        size (int): The size of the segment file in bytes.
+        offset (int): The position where the next record will be written.
+        outstanding (int): The number of records in the segment that have not been delivered yet.
+    """
+
+    RECORD_HEADER = struct.Struct("!IB")
+    PENDING = 0
+    DELIVERED = 1
+
+    def __init__(self, path, size, create=False):
+        """
+        Open and lock the segment file at the given path.
+
+        Args:
+            path (str): The path of the segment file.
+            size (int): The size of the segment file in bytes, used when the file is created.
+            create (bool, optional): Create and preallocate a new segment file. Defaults to False.
+
+        Raises:
+            FileExistsError: If create is True and the file already exists.
+            BlockingIOError: If the segment file is locked by another process.
+            ValueError: If the segment file is empty, as it is while another process creates it.
+        """
+        self.path = path
+        self.file = open(path, "x+b" if create else "r+b")
+        try:
+            if fcntl:
+                # A new segment can only be locked briefly by a process scanning the directory
+                fcntl.flock(self.file, fcntl.LOCK_EX if create else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if create:
+                self.file.truncate(size)
+            self.size = os.fstat(self.file.fileno()).st_size
+            self.map = mmap.mmap(self.file.fileno(), self.size)
+        except Exception:
+            self.file.close()
+            raise
+        self.offset = 0
+        self.outstanding = 0
+
+    def records(self):
+        """
+        Iterate over the records already written to the segment, and move offset past them.
+
+        Yields:
+            tuple: The (offset, state, payload) of each record.
+        """
+        header = Segment.RECORD_HEADER
+        while self.offset + header.size <= self.size:
+            length, state = header.unpack_from(self.map, self.offset)
+            if length == 0 or self.offset + header.size + length > self.size:
+                break
+            payload = self.map[self.offset + header.size:self.offset + header.size + length]
+            yield self.offset, state, payload
+            self.offset += header.size + length
+
+    def append(self, payload):
+        """
+        Write a pending record to the segment and flush it to disk.
+
+        The length is written last so that a partially written record is never read back.
+
+        Args:
+            payload (bytes): The payload of the record.
+
+        Returns:
+            int: The offset of the record, or None if the segment does not have room for it.
+        """
+        header = Segment.RECORD_HEADER
+        offset = self.offset
+        end = offset + header.size + len(payload)
+        if end > self.size:
+            return None
+        self.map[offset + header.size:end] = payload
+        header.pack_into(self.map, offset, len(payload), Segment.PENDING)
+        start = offset - offset % mmap.ALLOCATIONGRANULARITY
+        self.map.flush(start, end - start)
+        self.offset = end
+        self.outstanding += 1
+        return offset
+
+    def mark_delivered(self, offset):
+        """
+        Mark the record at the given offset as delivered.
+
+        Args:
+            offset (int): The offset of the record.
+        """
+        self.map[offset + Segment.RECORD_HEADER.size - 1] = Segment.DELIVERED
+        self.outstanding -= 1
+
+    def close(self, delete=False):
+        """
+        Unmap and unlock the segment, optionally deleting its file.
+
+        Args:
+            delete (bool, optional): Delete the segment file. Defaults to False.
+        """
+        self.map.close()
+        if delete:
+            os.remove(self.path)
+        self.file.close()
+
+class Spool:
+    """
+    A durable write-behind queue of records waiting to be delivered to end servers.
+
+    Records are appended to memory-mapped segment files that are rotated when full and deleted once all of
+    their records have been delivered. Each destination has its own queue, drained in order by a fixed pool of
+    background senders. A failed delivery puts its destination back with an exponential backoff instead of
+    holding a sender, so that one unavailable end server does not delay the others, and a destination is
+    forgotten once its queue is empty. Records still pending when the process stops are delivered again after
+    a restart, or by another process sharing the directory, which rescans it every rescan_interval seconds for
+    segments that are no longer locked. Each record is therefore delivered at least once.
+
+    Attributes:
+        directory (str): The directory holding the segment files.
+        segment_size (int): The size of each segment file in bytes.
+        deliver (Callable): The function called with (o1, o2, i3, i4) to deliver a record, raising on failure.
+        retry_delay (float): The delay in seconds before the first retry of a failed delivery.
+        max_retry_delay (float): The maximum delay in seconds between retries.
+        senders (int): The number of background sender threads.
+        rescan_interval (float): Time in seconds between scans of the directory for segments left by other
+            processes.
+    """
+
+    SEGMENT_NAME = "segment-{:08d}.spool"
+
+    def __init__(self, directory, segment_size, deliver, retry_delay=0.5, max_retry_delay=30.0, senders=8,
+                 rescan_interval=5.0):
+        """
+        Initialize a Spool object and queue the records left pending in the directory for delivery.
+
+        Args:
+            directory (str): The directory holding the segment files, created if it does not exist.
+            segment_size (int): The size of each segment file in bytes.
+            deliver (Callable): The function called with (o1, o2, i3, i4) to deliver a record, raising on failure.
+            retry_delay (float, optional): The delay in seconds before the first retry. Defaults to 0.5.
+            max_retry_delay (float, optional): The maximum delay in seconds between retries. Defaults to 30.0.
+            senders (int, optional): The number of background sender threads. Defaults to 8.
+            rescan_interval (float, optional): Time in seconds between scans of the directory for segments left
+                by other processes, such as the previous process after an upgrade. Defaults to 5.0.
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.deliver = deliver
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.senders = senders
+        self.rescan_interval = rescan_interval
+        self._lock = Lock()
+        self._wakeup = Condition(self._lock)
+        # Queued records and current retry delay of each destination with records pending
+        self._queues = {}
+        self._delays = {}
+        # Destinations waiting for a sender, as (due time, sequence, destination)
+        self._schedule = []
+        self._sequence = count()
+        self._segments = []
+        self._pending = 0
+        self._closed = False
+        os.makedirs(directory, exist_ok=True)
+        self._segment_number = 0
+        self._segment = None
+        with self._lock:
+            self._recover()
+            self._rotate()
+        self._next_rescan = time.monotonic() + rescan_interval
+        self._senders = [Thread(target=self._send, daemon=True) for _ in range(senders)]
+        for sender in self._senders:
+            sender.start()
+
+    def _recover(self):
+        """
+        Queue the pending records of the existing segment files, deleting the segments that have none.
+
+        Segments already open in this process are skipped, and segments locked by another process are left to
+        that process until a later scan. Must be called with _lock held.
+        """
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(".spool"))
+        open_paths = {segment.path for segment in self._segments}
+        recovered = 0
+        for name in names:
+            self._segment_number = max(self._segment_number, int(name[len("segment-"):-len(".spool")]))
+            path = os.path.join(self.directory, name)
+            if path in open_paths:
+                continue
+            try:
+                segment = self._open_segment(path)
+            except (BlockingIOError, FileNotFoundError):
+                logging.debug(f"Spool segment {name} is in use by another process, skipping it")
+                continue
+            except ValueError:
+                # The segment is being created by another process and is still empty
+                continue
+            if not os.path.exists(path):
+                # The process that held the segment deleted it before releasing it
+                self._segments.remove(segment)
+                segment.close()
+                continue
+            pending = [(offset, payload) for offset, state, payload in segment.records() if state == Segment.PENDING]
+            segment.outstanding = len(pending)
+            if not pending:
+                self._close_segment(segment)
+                continue
+            for offset, payload in pending:
+                o1, o2, i3, i4 = payload.decode().split(" ")
+                self._enqueue(segment, offset, (float(o1), float(o2), i3, int(i4)))
+            recovered += len(pending)
+        if recovered:
+            logging.info(f"Recovered {recovered} pending records from spool {self.directory}")
+
+    def _rotate(self):
+        """
+        Start writing to a new segment file, deleting the current one if all of its records were delivered.
+        """
+        previous = self._segment
+        while True:
+            self._segment_number += 1
+            path = os.path.join(self.directory, Spool.SEGMENT_NAME.format(self._segment_number))
+            try:
+                self._segment = self._open_segment(path, create=True)
+                break
+            except FileExistsError:
+                # Another process sharing the directory created this segment first
+                continue
+        if previous is not None and previous.outstanding == 0:
+            self._close_segment(previous)
+        logging.debug(f"Spool rotated to segment {path}")
+
+    def _open_segment(self, path, create=False):
+        """
+        Open a segment file and keep track of it until it is closed.
+        """
+        segment = Segment(path, self.segment_size, create)
+        self._segments.append(segment)
+        return segment
+
+    def _close_segment(self, segment):
+        """
+        Unmap a segment, deleting its file if all of its records were delivered.
+        """
+        self._segments.remove(segment)
+        segment.close(delete=segment.outstanding == 0)
+
+    def _enqueue(self, segment, offset, record):
+        """
+        Add a record to the queue of its destination, scheduling the destination if it was idle.
+
+        Must be called with _lock held.
+        """
+        destination = (record[2], record[3])
+        queue = self._queues.get(destination)
+        if queue is None:
+            queue = self._queues[destination] = deque()
+            self._delays[destination] = self.retry_delay
+            self._schedule_destination(destination, 0)
+        self._pending += 1
+        queue.append((segment, offset, record))
+
+    def _schedule_destination(self, destination, delay):
+        """
+        Make a destination available to the senders after the given delay. Must be called with _lock held.
+        """
+        heapq.heappush(self._schedule, (time.monotonic() + delay, next(self._sequence), destination))
+        self._wakeup.notify()
+
+    def _next_destination(self):
+        """
+        Wait until a destination is due and take it off the schedule, or return None once the spool is closed.
+
+        Destinations that are due keep being delivered after close, the ones waiting to be retried are left in
+        the spool. The directory is rescanned while waiting. Must be called with _lock held.
+        """
+        while True:
+            now = time.monotonic()
+            if self._schedule and self._schedule[0][0] <= now:
+                return heapq.heappop(self._schedule)[2]
+            if self._closed:
+                return None
+            if now >= self._next_rescan:
+                self._next_rescan = now + self.rescan_interval
+                try:
+                    self._recover()
+                except OSError as e:
+                    logging.error(f"Error while rescanning spool {self.directory}: {e}")
+                continue
+            wakeup = self._next_rescan
+            if self._schedule:
+                wakeup = min(wakeup, self._schedule[0][0])
+            self._wakeup.wait(wakeup - now)
+
+    def _send(self):
+        """
+        Deliver the record at the head of each due destination's queue, one destination at a time.
+
+        A destination is off the schedule while a sender delivers to it, so its records are delivered in order.
+        """
+        while True:
+            with self._lock:
+                destination = self._next_destination()
+                if destination is None:
+                    return
+                segment, offset, record = self._queues[destination][0]
+                delay = self._delays[destination]
+            try:
+                self.deliver(*record)
+                delivered = True
+            except Exception as e:
+                delivered = False
+                logging.warning(f"Delivery to {destination[0]}:{destination[1]} failed, retrying in {delay} seconds: {e}")
+            with self._lock:
+                queue = self._queues[destination]
+                if delivered:
+                    queue.popleft()
+                    segment.mark_delivered(offset)
+                    self._pending -= 1
+                    if segment.outstanding == 0 and segment is not self._segment:
+                        self._close_segment(segment)
+                    self._delays[destination] = self.retry_delay
+                    if queue:
+                        self._schedule_destination(destination, 0)
+                    else:
+                        del self._queues[destination]
+                        del self._delays[destination]
+                else:
+                    self._delays[destination] = min(delay * 2, self.max_retry_delay)
+                    self._schedule_destination(destination, delay)
+
+    def append(self, o1, o2, i3, i4):
+        """
+        Durably store a record and queue it for delivery.
+
+        Args:
+            o1 (float): The result of I1 / I2.
+            o2 (float): The result of I1 ** I2.
+            i3 (str): The IP address or host name of the target end server.
+            i4 (int): The port number of the target end server.
+
+        Raises:
+            ValueError: If the record is larger than a segment.
+
+        Example:
+        >>> spool.append(2.5, 25.0, "127.0.0.1", 8081)
+        """
+        payload = f"{o1} {o2} {i3} {i4}".encode()
+        if Segment.RECORD_HEADER.size + len(payload) > self.segment_size:
+            raise ValueError(f"Record of {len(payload)} bytes does not fit in a spool segment")
+        with self._lock:
+            offset = self._segment.append(payload)
+            if offset is None:
+                self._rotate()
+                offset = self._segment.append(payload)
+            self._enqueue(self._segment, offset, (o1, o2, i3, i4))
+
+    def pending(self):
+        """
+        Return the number of records that have not been delivered yet.
+
+        Returns:
+            int: The number of queued records.
+        """
+        with self._lock:
+            return self._pending
+
+    def close(self):
+        """
+        Stop the senders once the destinations that are due are drained, and unmap the segments.
+
+        Records of destinations waiting to be retried stay in the spool until the next start.
+
+        Example:
+        >>> spool.close()
+        """
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify_all()
+        for sender in self._senders:
+            sender.join()
+        with self._lock:
+            for segment in list(self._segments):
+                self._close_segment(segment)
@@ -0,0 +1,41 @@
+import ssl
+
+# Create the TLS context of the relay server's listener
+def create_server_context(certfile, keyfile, ciphers=None, session_tickets=True, num_tickets=2):
+    """
+    Create a server-side TLS context for the relay server.
+
+    Sessions can be resumed from the server's session cache (TLS 1.2) or from session tickets (TLS 1.2 and 1.3),
+    so that clients reconnecting within the session lifetime skip the key exchange and certificate verification.
+
+    Args:
+        certfile (str): The path of the PEM certificate chain of the server.
+        keyfile (str): The path of the PEM private key of the server.
+        ciphers (str, optional): The OpenSSL cipher string for TLS 1.2 connections, in order of preference.
+            Defaults to None, which keeps the Python defaults.
+        session_tickets (bool, optional): Issue session tickets. Defaults to True.
+        num_tickets (int, optional): The number of TLS 1.3 tickets issued after each full handshake. Defaults to 2.
+
+    Returns:
+        ssl.SSLContext: The server context.
+
+    Raises:
+        FileNotFoundError: If the certificate or key file is not found.
+        ssl.SSLError: If the certificate, key or cipher string is invalid.
+
+    Example:
+    >>> tls_context = create_server_context("server.pem", "server.key", ciphers="ECDHE+AESGCM")
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(certfile, keyfile)
+    if ciphers:
+        context.set_ciphers(ciphers)
+    # Use the server's cipher preference order rather than the client's
+    context.options |= ssl.OP_CIPHER_SERVER_PREFERENCE
+    if session_tickets:
+        context.num_tickets = num_tickets
+    else:
+        context.options |= ssl.OP_NO_TICKET
+        context.num_tickets = 0
+    return context
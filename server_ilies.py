@@ -1,9 +1,77 @@
 import argparse
 import logging
+import os
+import signal
+import subprocess
+import sys
+from threading import Thread
 from netsec import setup_logging
 from netsec import read_config
 from netsec.relay_server import RelayServer
+from netsec.resolver import HostsFileLookup, Resolver, getaddrinfo_lookup
 from netsec.sanitizer import Sanitizer
+from netsec.tls import create_server_context
+
+# Read the limits that can be changed while the relay server is running
+def read_limits(args, config):
+    max_clients = args.max_clients or config.getint("RelayServer", "max_clients", fallback=10)
+    if not isinstance(max_clients, int) or max_clients < 0:
+        raise ValueError("The maximum number of clients must be a non-negative integer")
+    client_timeout = args.client_timeout or config.getfloat("RelayServer", "client_timeout", fallback=60.0)
+    if client_timeout < 0:
+        raise ValueError("The client timeout must be non-negative")
+    response_timeout = args.response_timeout or config.getfloat("RelayServer", "response_timeout", fallback=10.0)
+    if response_timeout < 0:
+        raise ValueError("The response timeout must be non-negative")
+    requests_per_minute = args.requests_per_minute or config.getint("RelayServer", "requests_per_minute", fallback=60)
+    if not isinstance(requests_per_minute, int) or requests_per_minute < 0:
+        raise ValueError("The maximum number of requests per minute must be a non-negative integer")
+    read_deadline = args.read_deadline or config.getfloat("RelayServer", "read_deadline", fallback=10.0)
+    if read_deadline <= 0:
+        raise ValueError("The read deadline must be positive")
+    min_read_rate = args.min_read_rate or config.getfloat("RelayServer", "min_read_rate", fallback=32.0)
+    if min_read_rate < 0:
+        raise ValueError("The minimum read rate must be non-negative")
+    max_line_length = args.max_line_length or config.getint("RelayServer", "max_line_length", fallback=1024)
+    if max_line_length <= 0:
+        raise ValueError("The maximum line length must be positive")
+    return (max_clients, client_timeout, response_timeout, requests_per_minute, read_deadline, min_read_rate,
+            max_line_length)
+
+# Re-read the configuration file and apply the new limits to the running relay server
+def reload_config(args, relay_server):
+    try:
+        config = read_config(args.config_path)
+        relay_server.apply_limits(*read_limits(args, config))
+    except Exception as e:
+        logging.error(f"Configuration reload failed, keeping the current limits: {e}")
+
+# Start a new process on the same listening socket and drain this one once the new process is ready
+def upgrade(relay_server):
+    if relay_server.stopping.is_set() or relay_server.server_socket is None:
+        return
+    listen_fd = relay_server.server_socket.fileno()
+    ready_read, ready_write = os.pipe()
+    env = dict(os.environ, NETSEC_LISTEN_FD=str(listen_fd), NETSEC_READY_FD=str(ready_write))
+    try:
+        process = subprocess.Popen([sys.executable] + sys.argv, pass_fds=(listen_fd, ready_write), env=env)
+    except OSError as e:
+        logging.error(f"Upgrade failed, could not start a new process: {e}")
+        os.close(ready_read)
+        return
+    finally:
+        os.close(ready_write)
+    logging.info(f"Upgrade started, new process {process.pid} is taking over the listening socket")
+
+    # The new process writes to the pipe once it is about to accept, and closes it without writing if it fails
+    def wait_until_ready():
+        with os.fdopen(ready_read, "rb") as ready:
+            if ready.read(1):
+                relay_server.stop()
+            else:
+                logging.error(f"Upgrade failed, new process {process.pid} exited before accepting connections")
+
+    Thread(target=wait_until_ready, daemon=True).start()
 
 def main():
     parser = argparse.ArgumentParser(description="Start Relay server.")
@@ -17,6 +85,15 @@ def main():
     parser.add_argument("--client-timeout", dest="client_timeout", type=float, help="Client timeout in seconds (overrides value in config file)")
     parser.add_argument("--response-timeout", dest="response_timeout", type=float, help="Response timeout in seconds (overrides value in config file)")
     parser.add_argument("--requests-per-minute", dest="requests_per_minute", type=int, help="Maximum number of requests per minute (overrides value in config file)")
+    parser.add_argument("--read-deadline", dest="read_deadline", type=float, help="Time in seconds a client has to finish sending a request (overrides value in config file)")
+    parser.add_argument("--min-read-rate", dest="min_read_rate", type=float, help="Minimum rate in bytes per second at which a client must send a request (overrides value in config file)")
+    parser.add_argument("--max-line-length", dest="max_line_length", type=int, help="Maximum length of a text request in bytes (overrides value in config file)")
+    parser.add_argument("--hosts-file", dest="hosts_file", help="Resolve end server host names from this hosts file instead of the system resolver (overrides value in config file)")
+    parser.add_argument("--tls-certfile", dest="tls_certfile", help="PEM certificate chain to accept clients over TLS (overrides value in config file)")
+    parser.add_argument("--tls-keyfile", dest="tls_keyfile", help="PEM private key of the TLS certificate (overrides value in config file)")
+    parser.add_argument("--buffer-size", dest="buffer_size", type=int, help="Receive buffer size in bytes per connection (overrides value in config file)")
+    parser.add_argument("--write-behind", dest="write_behind", action="store_true", help="Acknowledge requests once spooled and deliver them in the background (overrides value in config file)")
+    parser.add_argument("--spool-directory", dest="spool_directory", help="Directory of the write-behind spool (overrides value in config file)")
     args = parser.parse_args()
 
     # Configure logging based on command line arguments
@@ -35,24 +112,75 @@ def main():
         Sanitizer.validate_port(port)
 
         # Get other configuration parameters
-        max_clients = args.max_clients or config.getint("RelayServer", "max_clients", fallback=10)
-        if not isinstance(max_clients, int) or max_clients < 0:
-            raise ValueError("The maximum number of clients must be a non-negative integer")
-        client_timeout = args.client_timeout or config.getfloat("RelayServer", "client_timeout", fallback=60.0)
-        if client_timeout < 0:
-            raise ValueError("The client timeout must be non-negative")
-        response_timeout = args.response_timeout or config.getfloat("RelayServer", "response_timeout", fallback=10.0)
-        if response_timeout < 0:
-            raise ValueError("The response timeout must be non-negative")
-        requests_per_minute = args.requests_per_minute or config.getint("RelayServer", "requests_per_minute", fallback=60)
-        if not isinstance(requests_per_minute, int) or requests_per_minute < 0:
-            raise ValueError("The maximum number of requests per minute must be a non-negative integer")
+        limits = read_limits(args, config)
+        resolver_ttl = config.getfloat("RelayServer", "resolver_ttl", fallback=60.0)
+        if resolver_ttl < 0:
+            raise ValueError("The resolver TTL must be non-negative")
+        resolver_negative_ttl = config.getfloat("RelayServer", "resolver_negative_ttl", fallback=10.0)
+        if resolver_negative_ttl < 0:
+            raise ValueError("The resolver negative TTL must be non-negative")
+        hosts_file = args.hosts_file or config.get("RelayServer", "hosts_file", fallback=None)
+        if hosts_file and not os.path.exists(hosts_file):
+            raise FileNotFoundError(f"Hosts file '{hosts_file}' not found")
+        lookup = HostsFileLookup(hosts_file) if hosts_file else getaddrinfo_lookup
+        resolver = Resolver(lookup, ttl=resolver_ttl, negative_ttl=resolver_negative_ttl)
+        buffer_size = args.buffer_size or config.getint("RelayServer", "buffer_size", fallback=4096)
+        if buffer_size < 64:
+            raise ValueError("The buffer size must be at least 64 bytes")
+        write_behind = args.write_behind or config.getboolean("RelayServer", "write_behind", fallback=False)
+        spool_directory = args.spool_directory or config.get("RelayServer", "spool_directory", fallback="spool")
+        spool_segment_size = config.getint("RelayServer", "spool_segment_size", fallback=1048576)
+        if spool_segment_size < 4096:
+            raise ValueError("The spool segment size must be at least 4096 bytes")
+
+        tls_certfile = args.tls_certfile or config.get("RelayServer", "tls_certfile", fallback=None)
+        tls_context = None
+        if tls_certfile:
+            tls_keyfile = args.tls_keyfile or config.get("RelayServer", "tls_keyfile", fallback=None)
+            for path in (tls_certfile, tls_keyfile):
+                if path and not os.path.exists(path):
+                    raise FileNotFoundError(f"TLS file '{path}' not found")
+            tls_context = create_server_context(tls_certfile, tls_keyfile,
+                                                ciphers=config.get("RelayServer", "tls_ciphers", fallback=None),
+                                                session_tickets=config.getboolean("RelayServer", "tls_session_tickets", fallback=True))
 
         # Create a RelayServer instance and start it
-        relay_server = RelayServer(ip_address, port, max_clients, client_timeout, response_timeout, requests_per_minute)
-        relay_server.start()
+        max_clients, client_timeout, response_timeout, requests_per_minute, read_deadline, min_read_rate, max_line_length = limits
+        relay_server = RelayServer(ip_address, port, max_clients, client_timeout, response_timeout, requests_per_minute,
+                                   buffer_size=buffer_size,
+                                   spool_directory=spool_directory if write_behind else None,
+                                   spool_segment_size=spool_segment_size,
+                                   read_deadline=read_deadline,
+                                   min_read_rate=min_read_rate,
+                                   max_line_length=max_line_length,
+                                   resolver=resolver)
+
+        # Reload the limits on SIGHUP and hand the listening socket over to a new process on SIGUSR2
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda signum, frame: reload_config(args, relay_server))
+            signal.signal(signal.SIGUSR2, lambda signum, frame: upgrade(relay_server))
+
+        # When started by an upgrade, take over the listening socket of the previous process
+        listen_fd = os.environ.pop("NETSEC_LISTEN_FD", None)
+        ready_fd = os.environ.pop("NETSEC_READY_FD", None)
+        ready_fd = int(ready_fd) if ready_fd else None
+
+        # Tell the previous process to stop once the inherited socket is set up, closing the pipe either way
+        def report_ready():
+            nonlocal ready_fd
+            if ready_fd is not None:
+                os.write(ready_fd, b"1")
+                os.close(ready_fd)
+                ready_fd = None
+
+        try:
+            relay_server.start(listen_fd=int(listen_fd) if listen_fd else None, tls_context=tls_context,
+                               on_ready=report_ready)
+        finally:
+            if ready_fd is not None:
+                os.close(ready_fd)
 
-        print(f"Server started and listening on {ip_address}:{port}")
+        print(f"Server stopped listening on {ip_address}:{port}")
 
     except FileNotFoundError as e:
         logging.error(f"The configuration file {args.config_path} was not found: {str(e)}")
@@ -0,0 +1,71 @@
+import unittest
+import socket
+from netsec.buffers import BufferPool, ReceiveBuffer
+
+class TestBufferPool(unittest.TestCase):
+
+    def test_acquire_reuses_released_buffers(self):
+        pool = BufferPool(64, 2)
+        receive_buffer = pool.acquire()
+        self.assertEqual(len(receive_buffer.buffer), 64)
+        pool.release(receive_buffer)
+        self.assertIs(pool.acquire(), receive_buffer)
+        self.assertEqual(pool.allocations, 1)
+        self.assertEqual(pool.reuses, 1)
+
+    def test_release_clears_buffer(self):
+        pool = BufferPool(64, 1)
+        receive_buffer = pool.acquire()
+        receive_buffer.end = 10
+        pool.release(receive_buffer)
+        self.assertEqual(pool.acquire().pending, 0)
+
+    def test_release_keeps_at_most_max_idle(self):
+        pool = BufferPool(64, 1)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        self.assertIs(pool.acquire(), first)
+        self.assertIsNot(pool.acquire(), second)
+        self.assertEqual(pool.allocations, 3)
+
+class TestReceiveBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.server, self.client = socket.socketpair()
+        self.receive_buffer = ReceiveBuffer(16)
+
+    def tearDown(self):
+        self.server.close()
+        self.client.close()
+
+    def test_take_line(self):
+        self.client.sendall(b"ab\ncd")
+        self.receive_buffer.fill(self.server)
+        self.assertEqual(self.receive_buffer.take_line(), (0, 3))
+        self.assertIsNone(self.receive_buffer.take_line())
+        self.assertEqual(self.receive_buffer.take_all(), (3, 5))
+        self.assertIsNone(self.receive_buffer.take_all())
+
+    def test_take(self):
+        self.client.sendall(b"abcde")
+        self.receive_buffer.fill(self.server)
+        self.assertEqual(self.receive_buffer.take(4), (0, 4))
+        self.assertIsNone(self.receive_buffer.take(4))
+
+    def test_fill_moves_pending_bytes_to_front(self):
+        self.client.sendall(b"0123456789abc\nde")
+        self.receive_buffer.fill(self.server)
+        self.receive_buffer.take_line()
+        self.assertTrue(self.receive_buffer.end == len(self.receive_buffer.buffer))
+        self.client.sendall(b"f\n")
+        self.receive_buffer.fill(self.server)
+        start, end = self.receive_buffer.take_line()
+        self.assertEqual(bytes(self.receive_buffer.buffer[start:end]), b"def\n")
+
+    def test_fill_returns_zero_on_close(self):
+        self.client.close()
+        self.assertEqual(self.receive_buffer.fill(self.server), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,6 +16,11 @@ class TestClient(unittest.TestCase):
         self.assertEqual(self.client.addr, self.addr)
         self.assertEqual(self.client.timeout, self.timeout)
         self.assertEqual(self.client.request_timestamps, [])
+        self.assertIsNone(self.client.receive_buffer)
+        self.assertFalse(self.client.line_mode)
+        self.assertIsNone(self.client.read_started)
+        self.assertEqual(self.client.read_bytes, 0)
+        self.assertIsNone(self.client.serving_started)
 
     def test_check_request_limit_under_limit(self):
         requests_per_minute = 5
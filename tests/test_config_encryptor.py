@@ -0,0 +1,74 @@
+import unittest
+import io
+import os
+import sys
+from contextlib import redirect_stderr
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "clients"))
+
+try:
+    import config_encryptor
+except ImportError:
+    config_encryptor = None
+
+@unittest.skipUnless(config_encryptor, "pycryptodome is required by the clients")
+class TestConfigEncryptor(unittest.TestCase):
+
+    def encrypt(self, data, chunk_size=16):
+        destination = io.BytesIO()
+        config_encryptor.encrypt_stream(io.BytesIO(data), destination, "passphrase", chunk_size)
+        return destination.getvalue()
+
+    def decrypt(self, encrypted, passphrase="passphrase"):
+        return b"".join(config_encryptor.read_decrypted(io.BytesIO(encrypted), passphrase))
+
+    # Decrypt data that is expected to fail verification
+    def assert_rejected(self, encrypted):
+        with redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit):
+            self.decrypt(encrypted)
+        self.assertIn("Decryption failed", stderr.getvalue())
+
+    def test_round_trip(self):
+        for size in (1, 15, 16, 17, 48, 100):
+            data = os.urandom(size)
+            encrypted = self.encrypt(data)
+            self.assertTrue(encrypted.startswith(config_encryptor.STREAM_MAGIC))
+            self.assertEqual(self.decrypt(encrypted), data)
+
+    def test_empty_file(self):
+        encrypted = self.encrypt(b"")
+        self.assertEqual(len(encrypted), config_encryptor.STREAM_HEADER.size + config_encryptor.TAG_SIZE)
+        self.assertEqual(self.decrypt(encrypted), b"")
+
+    def test_chunks_are_decrypted_one_at_a_time(self):
+        chunks = config_encryptor.read_decrypted(io.BytesIO(self.encrypt(b"a" * 40)), "passphrase")
+        self.assertEqual([len(chunk) for chunk in chunks], [16, 16, 8])
+
+    def test_truncation_at_chunk_boundary_is_rejected(self):
+        encrypted = self.encrypt(os.urandom(48))
+        record = 16 + config_encryptor.TAG_SIZE
+        self.assert_rejected(encrypted[:config_encryptor.STREAM_HEADER.size + 2 * record])
+
+    def test_reordered_chunks_are_rejected(self):
+        encrypted = self.encrypt(os.urandom(48))
+        header = config_encryptor.STREAM_HEADER.size
+        record = 16 + config_encryptor.TAG_SIZE
+        first, second = encrypted[header:header + record], encrypted[header + record:header + 2 * record]
+        self.assert_rejected(encrypted[:header] + second + first + encrypted[header + 2 * record:])
+
+    def test_wrong_passphrase_is_rejected(self):
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            self.decrypt(self.encrypt(b"data"), "wrong")
+
+    def test_legacy_format_is_detected(self):
+        iv, ciphertext, tag = config_encryptor.encrypt_data(b"1 2 127.0.0.1 8081\n3 4 127.0.0.1 8081\n", "passphrase")
+        self.assertEqual(list(config_encryptor.read_lines(io.BytesIO(iv + ciphertext + tag), "passphrase")),
+                         [b"1 2 127.0.0.1 8081", b"3 4 127.0.0.1 8081"])
+
+    def test_lines_span_chunks(self):
+        encrypted = self.encrypt(b"1 2 127.0.0.1 8081\r\n3 4 127.0.0.1 8081\n5 6 127.0.0.1 8081")
+        self.assertEqual(list(config_encryptor.read_lines(io.BytesIO(encrypted), "passphrase")),
+                         [b"1 2 127.0.0.1 8081", b"3 4 127.0.0.1 8081", b"5 6 127.0.0.1 8081"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import io
+import os
+import socket
+import sys
+from contextlib import redirect_stdout
+from threading import Thread
+from netsec.client import Client
+from netsec.relay_server import RelayServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "clients"))
+
+try:
+    import good_client_ilies
+except ImportError:
+    good_client_ilies = None
+
+@unittest.skipUnless(good_client_ilies, "pycryptodome is required by the clients")
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.server, self.client = socket.socketpair()
+
+    def tearDown(self):
+        self.client.close()
+
+    # Serve the connection with a relay server and run the pipelined client against it
+    def pipeline(self, relay_server, lines, depth):
+        relay_server.current_clients = 1
+        worker = Thread(target=relay_server._process_request, args=(Client(self.server, "test", 2.0),))
+        worker.start()
+        output = io.StringIO()
+        client = Thread(target=lambda: self.run_client(output, lines, depth), daemon=True)
+        client.start()
+        client.join(5.0)
+        self.assertFalse(client.is_alive(), "The pipelined client did not return")
+        worker.join()
+        return output.getvalue().splitlines()
+
+    def run_client(self, output, lines, depth):
+        with redirect_stdout(output):
+            good_client_ilies.pipeline(self.client, iter(lines), depth)
+
+    def test_responses_are_matched_in_order(self):
+        relay_server = RelayServer("127.0.0.1", 8080, 10, 2.0, 1.0, 1000)
+        lines = [f"1 1 bad_host_{i} 8081".encode() for i in range(100)]
+        output = self.pipeline(relay_server, lines, 8)
+        expected = []
+        for i in range(100):
+            expected += [f"1 1 bad_host_{i} 8081", f"Invalid input value: Invalid host name: bad_host_{i}"]
+        self.assertEqual(output, expected)
+
+    def test_early_close_by_server(self):
+        relay_server = RelayServer("127.0.0.1", 8080, 10, 2.0, 1.0, 5)
+        lines = [b"5 0 127.0.0.1 8081"] * 100
+        output = self.pipeline(relay_server, lines, 3)
+        self.assertEqual(output.count("Invalid input value: Division by zero is not allowed"), 5)
+        self.assertIn("Request limit reached, try again later.", output)
+        self.assertTrue(output[-1].startswith("Error: connection closed by server with"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import struct
+from netsec.protocol import TextProtocol, BinaryProtocol, STATUS_SUCCESS, STATUS_INVALID_INPUT
+
+class TestTextProtocol(unittest.TestCase):
+
+    def test_parse_request(self):
+        self.assertEqual(TextProtocol.parse_request(b"5 2 127.0.0.1 8081"), (5.0, 2.0, "127.0.0.1", 8081))
+        self.assertEqual(TextProtocol.parse_request(b"5 2 127.0.0.1 8081\r\n"), (5.0, 2.0, "127.0.0.1", 8081))
+        with self.assertRaises(ValueError):
+            TextProtocol.parse_request(b"5 2 127.0.0.1")
+        with self.assertRaises(ValueError):
+            TextProtocol.parse_request(b"five 2 127.0.0.1 8081")
+
+    def test_parse_request_in_place(self):
+        buffer = bytearray(b"1 2 10.0.0.1 80\n5 2 127.0.0.1 8081\r\n")
+        self.assertEqual(TextProtocol.parse_request(buffer, 16, len(buffer)), (5.0, 2.0, "127.0.0.1", 8081))
+        with self.assertRaisesRegex(ValueError, "'4.5'"):
+            TextProtocol.parse_request(bytearray(b"1 2 10.0.0.1 4.5"))
+
+    def test_encode_response(self):
+        self.assertEqual(TextProtocol.encode_response(STATUS_SUCCESS, "Success"), b"Success\r\n")
+
+class TestBinaryProtocol(unittest.TestCase):
+
+    def test_request_round_trip(self):
+        request = BinaryProtocol.pack_request(5.0, -2.5, "192.168.1.20", 65535)
+        self.assertEqual(len(request), BinaryProtocol.REQUEST.size)
+        self.assertEqual(BinaryProtocol.parse_request(request), (5.0, -2.5, "192.168.1.20", 65535))
+
+    def test_parse_request_from_buffer_offset(self):
+        buffer = bytearray(BinaryProtocol.MAGIC) + BinaryProtocol.pack_request(1.0, 2.0, "10.0.0.1", 80)
+        self.assertEqual(BinaryProtocol.parse_request(memoryview(buffer), 1), (1.0, 2.0, "10.0.0.1", 80))
+
+    def test_parse_request_too_short(self):
+        with self.assertRaises(struct.error):
+            BinaryProtocol.parse_request(b"\x00" * (BinaryProtocol.REQUEST.size - 1))
+
+    def test_encode_response(self):
+        self.assertEqual(BinaryProtocol.encode_response(STATUS_SUCCESS, "Success"), b"\x00")
+        self.assertEqual(BinaryProtocol.encode_response(STATUS_INVALID_INPUT, "Invalid input value"), b"\x01")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+import unittest
+import os
+import socket
+import time
+from threading import Event, Thread
+from netsec.client import Client
+from netsec.relay_server import RelayServer
+
+class TestReadBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.relay_server = RelayServer("127.0.0.1", 8080, 10, 2.0, 1.0, 60, buffer_size=256,
+                                        read_deadline=0.5, min_read_rate=32, max_line_length=64)
+        self.server, self.client = socket.socketpair()
+        self.relay_server.current_clients = 1
+        self.worker = Thread(target=self.relay_server._process_request, args=(Client(self.server, "test", 2.0),))
+        self.worker.start()
+
+    def tearDown(self):
+        self.client.close()
+        self.worker.join()
+
+    def receive_all(self):
+        self.client.settimeout(3.0)
+        data = b""
+        while True:
+            chunk = self.client.recv(1024)
+            if not chunk:
+                return data
+            data += chunk
+
+    def test_complete_requests_are_processed(self):
+        self.client.sendall(b"5 0 127.0.0.1 8081\n")
+        self.assertEqual(self.client.recv(1024), b"Invalid input value: Division by zero is not allowed\r\n")
+        self.client.shutdown(socket.SHUT_WR)
+        self.assertEqual(self.receive_all(), b"")
+        self.worker.join()
+        self.assertEqual(self.relay_server.current_clients, 0)
+
+    # Send a complete line first so that the connection is in line mode, then trickle a request byte by byte
+    def trickle(self, delay):
+        self.client.sendall(b"5 0 127.0.0.1 8081\n")
+        self.client.recv(1024)
+        for byte in b"5 0 127.0.0.1 8081\n":
+            if not self.worker.is_alive():
+                break
+            try:
+                self.client.sendall(bytes([byte]))
+            except OSError:
+                break
+            time.sleep(delay)
+        self.assertEqual(self.receive_all(), b"")
+        self.worker.join()
+
+    def test_incomplete_request_past_deadline_is_disconnected(self):
+        self.relay_server.min_read_rate = 0
+        self.trickle(0.2)
+        self.assertEqual(dict(self.relay_server.disconnects), {"read_deadline": 1})
+
+    def test_request_below_min_read_rate_is_disconnected(self):
+        self.relay_server.read_deadline = 10.0
+        self.trickle(0.1)
+        self.assertEqual(dict(self.relay_server.disconnects), {"min_read_rate": 1})
+
+    def test_silent_client_is_disconnected_at_read_deadline(self):
+        started = time.monotonic()
+        self.assertEqual(self.receive_all(), b"")
+        self.worker.join()
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(dict(self.relay_server.disconnects), {"read_deadline": 1})
+
+    def test_time_waiting_for_a_worker_does_not_count(self):
+        # A server of its own, as the connection of setUp is dropped for staying silent meanwhile
+        relay_server = RelayServer("127.0.0.1", 8080, 10, 2.0, 1.0, 60, read_deadline=0.5)
+        server, client = socket.socketpair()
+        queued = Client(server, "queued", 2.0)
+        client.sendall(b"5 0 127.0.0.1 8081\n")
+        time.sleep(0.6)
+        relay_server.current_clients = 1
+        worker = Thread(target=relay_server._process_request, args=(queued,))
+        worker.start()
+        client.settimeout(3.0)
+        self.assertEqual(client.recv(1024), b"Invalid input value: Division by zero is not allowed\r\n")
+        client.close()
+        worker.join()
+        self.assertEqual(dict(relay_server.disconnects), {})
+
+    def test_client_may_stay_silent_between_requests(self):
+        self.client.sendall(b"5 0 127.0.0.1 8081\n")
+        self.client.recv(1024)
+        time.sleep(1.0)
+        self.client.sendall(b"5 0 127.0.0.1 8081\n")
+        self.assertEqual(self.client.recv(1024), b"Invalid input value: Division by zero is not allowed\r\n")
+        self.assertEqual(dict(self.relay_server.disconnects), {})
+
+    # Pipeline two requests with the second split across reads, while the end server takes the given time
+    def split_pipelined_request(self, delay):
+        self.relay_server.send_data_to_end_server = lambda *args, **kwargs: time.sleep(delay)
+        self.client.sendall(b"5 2 127.0.0.1 8081\n5 2 12")
+        time.sleep(0.1)
+        self.client.sendall(b"7.0.0.1 8081\n")
+        self.client.shutdown(socket.SHUT_WR)
+        self.assertEqual(self.receive_all(), b"Success\r\n" * 2)
+        self.worker.join()
+        self.assertEqual(dict(self.relay_server.disconnects), {})
+
+    def test_slow_end_server_does_not_count_against_read_deadline(self):
+        self.split_pipelined_request(0.8)
+
+    def test_slow_end_server_does_not_count_against_min_read_rate(self):
+        self.relay_server.read_deadline = 10.0
+        self.split_pipelined_request(1.2)
+
+    def test_line_too_long_is_disconnected(self):
+        self.client.sendall(b"1" * 100)
+        self.assertEqual(self.receive_all(), b"")
+        self.worker.join()
+        self.assertEqual(dict(self.relay_server.disconnects), {"line_too_long": 1})
+
+class TestLifecycle(unittest.TestCase):
+
+    def setUp(self):
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        self.relay_server = RelayServer("127.0.0.1", self.port, 10, 2.0, 1.0, 60)
+        self.ready = Event()
+
+    def tearDown(self):
+        self.relay_server.stop()
+        self.listener.close()
+
+    # Start the relay server on a duplicate of the test's listening socket, as after an upgrade
+    def start(self):
+        thread = Thread(target=self.relay_server.start, kwargs={"listen_fd": os.dup(self.listener.fileno()),
+                                                                 "on_ready": self.ready.set})
+        thread.start()
+        self.assertTrue(self.ready.wait(2.0))
+        return thread
+
+    def request(self, conn):
+        conn.sendall(b"5 0 127.0.0.1 8081\n")
+        return conn.recv(1024)
+
+    def test_start_on_inherited_socket(self):
+        thread = self.start()
+        with socket.create_connection(("127.0.0.1", self.port), timeout=2.0) as conn:
+            self.assertEqual(self.request(conn), b"Invalid input value: Division by zero is not allowed\r\n")
+        self.relay_server.stop()
+        thread.join(3.0)
+        self.assertFalse(thread.is_alive())
+
+    def test_start_on_socket_not_listening(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            with self.assertRaises(OSError):
+                self.relay_server.start(listen_fd=os.dup(sock.fileno()), on_ready=self.ready.set)
+        self.assertFalse(self.ready.is_set())
+
+    def test_stop_drains_connected_clients(self):
+        thread = self.start()
+        conn = socket.create_connection(("127.0.0.1", self.port), timeout=2.0)
+        self.request(conn)
+        self.relay_server.stop()
+        time.sleep(1.5)
+        # The accept loop has ended, but start waits for the connected client
+        self.assertTrue(thread.is_alive())
+        self.assertEqual(self.request(conn), b"Invalid input value: Division by zero is not allowed\r\n")
+        conn.close()
+        thread.join(3.0)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.relay_server.current_clients, 0)
+
+    def test_apply_limits(self):
+        thread = self.start()
+        conn = socket.create_connection(("127.0.0.1", self.port), timeout=2.0)
+        self.request(conn)
+        self.relay_server.apply_limits(1, 2.0, 1.0, 1, 10.0, 32, 1024)
+        # The next request of a connected client is held to the new request limit
+        self.assertEqual(self.request(conn), b"Request limit reached, try again later.\r\n")
+        self.assertEqual(conn.recv(1024), b"")
+        conn.close()
+        deadline = time.time() + 2.0
+        while self.relay_server.current_clients and time.time() < deadline:
+            time.sleep(0.01)
+        # And the next connection to the new client limit, while another client is connected
+        with socket.create_connection(("127.0.0.1", self.port), timeout=2.0) as first:
+            self.request(first)
+            with socket.create_connection(("127.0.0.1", self.port), timeout=2.0) as second:
+                self.assertEqual(second.recv(1024), b"Connection limit reached, try again later.\r\n")
+        self.relay_server.stop()
+        thread.join(3.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import os
+import socket
+import tempfile
+import time
+from threading import Event, Thread
+from netsec.resolver import HostsFileLookup, Resolver
+
+class TestHostsFileLookup(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, "w") as f:
+            f.write("# End servers\n")
+            f.write("10.0.0.5 end-server.local end-server  # primary\n")
+            f.write("10.0.0.6 end-server.local\n")
+            f.write("::1 end-server.local\n")
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_lookup(self):
+        lookup = HostsFileLookup(self.path)
+        self.assertEqual(lookup("end-server.local"), ["10.0.0.5", "10.0.0.6"])
+        self.assertEqual(lookup("END-SERVER"), ["10.0.0.5"])
+        with self.assertRaises(socket.gaierror):
+            lookup("unknown.local")
+
+class TestResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.lookups = []
+
+    def lookup(self, name):
+        self.lookups.append(name)
+        if name == "unknown.local":
+            raise socket.gaierror(socket.EAI_NONAME, "Name not found")
+        return ["10.0.0.5"]
+
+    def test_ip_address_is_not_looked_up(self):
+        resolver = Resolver(self.lookup)
+        self.assertEqual(resolver.resolve("127.0.0.1"), "127.0.0.1")
+        self.assertEqual(self.lookups, [])
+
+    def test_lookups_are_cached_until_ttl(self):
+        resolver = Resolver(self.lookup, ttl=0.2)
+        self.assertEqual(resolver.resolve("end-server.local"), "10.0.0.5")
+        self.assertEqual(resolver.resolve("End-Server.local"), "10.0.0.5")
+        self.assertEqual(len(self.lookups), 1)
+        time.sleep(0.3)
+        resolver.resolve("end-server.local")
+        self.assertEqual(len(self.lookups), 2)
+
+    def test_failed_lookups_are_cached_until_negative_ttl(self):
+        resolver = Resolver(self.lookup, negative_ttl=0.2)
+        for _ in range(3):
+            with self.assertRaises(socket.gaierror):
+                resolver.resolve("unknown.local")
+        self.assertEqual(len(self.lookups), 1)
+        time.sleep(0.3)
+        with self.assertRaises(socket.gaierror):
+            resolver.resolve("unknown.local")
+        self.assertEqual(len(self.lookups), 2)
+
+    def test_cached_failures_are_raised_afresh(self):
+        resolver = Resolver(self.lookup)
+        errors = []
+        for _ in range(100):
+            try:
+                resolver.resolve("unknown.local")
+            except socket.gaierror as e:
+                errors.append(e)
+        self.assertEqual(len(self.lookups), 1)
+        self.assertEqual(len({id(e) for e in errors}), 100)
+        depths = set()
+        for e in errors:
+            depth, tb = 0, e.__traceback__
+            while tb:
+                depth, tb = depth + 1, tb.tb_next
+            depths.add(depth)
+        self.assertEqual(len(depths), 1)
+        self.assertEqual(errors[-1].errno, socket.EAI_NONAME)
+        self.assertEqual(str(errors[-1]), str(errors[0]))
+
+    def test_concurrent_lookups_are_collapsed(self):
+        release = Event()
+
+        def slow_lookup(name):
+            self.lookups.append(name)
+            release.wait()
+            return ["10.0.0.5"]
+
+        resolver = Resolver(slow_lookup)
+        results = []
+        threads = [Thread(target=lambda: results.append(resolver.resolve("end-server.local"))) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["10.0.0.5"] * 10)
+        self.assertEqual(self.lookups, ["end-server.local"])
+
+    def test_cache_is_bounded(self):
+        resolver = Resolver(self.lookup, max_entries=2)
+        for name in ("a.local", "b.local", "c.local", "a.local"):
+            resolver.resolve(name)
+        self.assertEqual(self.lookups, ["a.local", "b.local", "c.local", "a.local"])
+
+if __name__ == '__main__':
+    unittest.main()
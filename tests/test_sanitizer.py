@@ -15,6 +15,19 @@ class TestSanitizer(unittest.TestCase):
         with self.assertRaises(ValueError):
             Sanitizer.validate_ip("0.0.0.0", check_specific_ips=True)
 
+    def test_validate_host(self):
+        self.assertIsNone(Sanitizer.validate_host("127.0.0.1"))
+        self.assertIsNone(Sanitizer.validate_host("end-server.example.com"))
+        self.assertIsNone(Sanitizer.validate_host("localhost"))
+        with self.assertRaises(ValueError):
+            Sanitizer.validate_host("1.2.3.256")
+        with self.assertRaises(ValueError):
+            Sanitizer.validate_host("-end-server.example.com")
+        with self.assertRaises(ValueError):
+            Sanitizer.validate_host("end_server.example.com")
+        with self.assertRaises(ValueError):
+            Sanitizer.validate_host("a" * 64 + ".com")
+
     def test_validate_port(self):
         self.assertIsNone(Sanitizer.validate_port(8080))
         with self.assertRaises(ValueError):
@@ -0,0 +1,153 @@
+import unittest
+import os
+import tempfile
+import threading
+import time
+from netsec.spool import Spool
+
+class TestSpool(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.delivered = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def wait_for(self, condition, timeout=5.0):
+        deadline = time.time() + timeout
+        while not condition():
+            if time.time() > deadline:
+                self.fail("Condition not met before the timeout")
+            time.sleep(0.01)
+
+    def segment_files(self):
+        return sorted(name for name in os.listdir(self.directory.name) if name.endswith(".spool"))
+
+    def test_append_delivers_records_in_order(self):
+        spool = Spool(self.directory.name, 4096, lambda *record: self.delivered.append(record))
+        spool.append(2.5, 25.0, "127.0.0.1", 8081)
+        spool.append(0.5, 1.0, "127.0.0.1", 8081)
+        self.wait_for(lambda: spool.pending() == 0)
+        spool.close()
+        self.assertEqual(self.delivered, [(2.5, 25.0, "127.0.0.1", 8081), (0.5, 1.0, "127.0.0.1", 8081)])
+        self.assertEqual(self.segment_files(), [])
+
+    def test_failed_delivery_is_retried(self):
+        attempts = []
+
+        def deliver(*record):
+            attempts.append(record)
+            if len(attempts) < 3:
+                raise ConnectionRefusedError("Connection refused")
+            self.delivered.append(record)
+
+        spool = Spool(self.directory.name, 4096, deliver, retry_delay=0.01)
+        spool.append(2.5, 25.0, "127.0.0.1", 8081)
+        self.wait_for(lambda: spool.pending() == 0)
+        spool.close()
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(self.delivered, [(2.5, 25.0, "127.0.0.1", 8081)])
+
+    def test_unavailable_destination_does_not_block_others(self):
+        def deliver(*record):
+            if record[3] == 9999:
+                raise ConnectionRefusedError("Connection refused")
+            self.delivered.append(record)
+
+        spool = Spool(self.directory.name, 4096, deliver, retry_delay=0.01)
+        spool.append(1.0, 1.0, "127.0.0.1", 9999)
+        spool.append(2.5, 25.0, "127.0.0.1", 8081)
+        self.wait_for(lambda: spool.pending() == 1)
+        spool.close()
+        self.assertEqual(self.delivered, [(2.5, 25.0, "127.0.0.1", 8081)])
+
+    def test_pending_records_survive_restart(self):
+        def unavailable(*record):
+            raise ConnectionRefusedError("Connection refused")
+
+        spool = Spool(self.directory.name, 4096, unavailable, retry_delay=0.01)
+        spool.append(2.5, 25.0, "127.0.0.1", 8081)
+        spool.close()
+        self.assertEqual(len(self.segment_files()), 1)
+
+        spool = Spool(self.directory.name, 4096, lambda *record: self.delivered.append(record))
+        self.wait_for(lambda: spool.pending() == 0)
+        spool.close()
+        self.assertEqual(self.delivered, [(2.5, 25.0, "127.0.0.1", 8081)])
+        self.assertEqual(self.segment_files(), [])
+
+    def test_segments_in_use_are_skipped(self):
+        def unavailable(*record):
+            raise ConnectionRefusedError("Connection refused")
+
+        spool = Spool(self.directory.name, 4096, unavailable, retry_delay=0.01)
+        spool.append(2.5, 25.0, "127.0.0.1", 8081)
+        other = Spool(self.directory.name, 4096, lambda *record: self.delivered.append(record))
+        self.assertEqual(other.pending(), 0)
+        other.append(0.5, 1.0, "127.0.0.1", 8081)
+        self.wait_for(lambda: other.pending() == 0)
+        other.close()
+        spool.close()
+        self.assertEqual(self.delivered, [(0.5, 1.0, "127.0.0.1", 8081)])
+        self.assertEqual(len(self.segment_files()), 1)
+
+    def test_segments_released_by_another_process_are_recovered(self):
+        def unavailable(*record):
+            raise ConnectionRefusedError("Connection refused")
+
+        spool = Spool(self.directory.name, 4096, unavailable, retry_delay=0.01)
+        spool.append(2.5, 25.0, "127.0.0.1", 8081)
+        other = Spool(self.directory.name, 4096, lambda *record: self.delivered.append(record), rescan_interval=0.05)
+        self.assertEqual(other.pending(), 0)
+        spool.close()
+        self.wait_for(lambda: self.delivered == [(2.5, 25.0, "127.0.0.1", 8081)])
+        self.wait_for(lambda: other.pending() == 0)
+        other.close()
+        self.assertEqual(self.segment_files(), [])
+
+    def test_senders_are_bounded(self):
+        def deliver(*record):
+            if record[3] % 2:
+                raise ConnectionRefusedError("Connection refused")
+            self.delivered.append(record)
+
+        threads = threading.active_count()
+        spool = Spool(self.directory.name, 65536, deliver, retry_delay=0.01, senders=4)
+        for port in range(1, 1001):
+            spool.append(1.0, 1.0, "127.0.0.1", port)
+        self.assertLessEqual(threading.active_count(), threads + 4)
+        self.wait_for(lambda: spool.pending() == 500)
+        self.assertEqual(len(spool._queues), 500)
+        spool.close()
+        self.assertEqual(len(self.delivered), 500)
+        self.assertEqual(threading.active_count(), threads)
+
+    def test_idle_destinations_are_forgotten(self):
+        spool = Spool(self.directory.name, 4096, lambda *record: self.delivered.append(record))
+        spool.append(2.5, 25.0, "127.0.0.1", 8081)
+        spool.append(0.5, 1.0, "127.0.0.1", 8082)
+        self.wait_for(lambda: spool.pending() == 0)
+        self.assertEqual(spool._queues, {})
+        spool.append(0.5, 1.0, "127.0.0.1", 8081)
+        self.wait_for(lambda: spool.pending() == 0)
+        spool.close()
+        self.assertEqual(len(self.delivered), 3)
+
+    def test_segments_are_rotated(self):
+        spool = Spool(self.directory.name, 64, lambda *record: self.delivered.append(record))
+        for i in range(10):
+            spool.append(float(i), 1.0, "127.0.0.1", 8081)
+        self.wait_for(lambda: spool.pending() == 0)
+        spool.close()
+        self.assertEqual([record[0] for record in self.delivered], [float(i) for i in range(10)])
+        self.assertEqual(self.segment_files(), [])
+
+    def test_record_larger_than_segment(self):
+        spool = Spool(self.directory.name, 16, lambda *record: None)
+        with self.assertRaises(ValueError):
+            spool.append(2.5, 25.0, "127.0.0.1", 8081)
+        spool.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+from threading import Thread
+from netsec.client import Client
+from netsec.relay_server import RelayServer
+from netsec.tls import create_server_context
+
+@unittest.skipUnless(shutil.which("openssl"), "openssl is required to generate a test certificate")
+class TestTLS(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.certfile = os.path.join(cls.directory.name, "server.pem")
+        cls.keyfile = os.path.join(cls.directory.name, "server.key")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+                        "-keyout", cls.keyfile, "-out", cls.certfile],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.client_context = ssl.create_default_context(cafile=self.certfile)
+        self.client_context.check_hostname = False
+
+    def test_create_server_context(self):
+        context = create_server_context(self.certfile, self.keyfile, ciphers="ECDHE+AESGCM")
+        self.assertEqual(context.minimum_version, ssl.TLSVersion.TLSv1_2)
+        self.assertTrue(context.options & ssl.OP_CIPHER_SERVER_PREFERENCE)
+        self.assertFalse(context.options & ssl.OP_NO_TICKET)
+        context = create_server_context(self.certfile, self.keyfile, session_tickets=False)
+        self.assertTrue(context.options & ssl.OP_NO_TICKET)
+        with self.assertRaises(ssl.SSLError):
+            create_server_context(self.certfile, self.keyfile, ciphers="NOT-A-CIPHER")
+
+    # Serve one connection with the relay server and send it a request over TLS
+    def request(self, relay_server, tls_context, session=None):
+        server, client = socket.socketpair()
+        conn = tls_context.wrap_socket(server, server_side=True, do_handshake_on_connect=False)
+        relay_server.current_clients += 1
+        worker = Thread(target=relay_server._process_request, args=(Client(conn, "test", 2.0),))
+        worker.start()
+        with self.client_context.wrap_socket(client, server_hostname="localhost", session=session) as tls_client:
+            tls_client.sendall(b"5 0 127.0.0.1 8081\n")
+            response = tls_client.recv(1024)
+            session = tls_client.session
+        worker.join()
+        return response, session
+
+    def test_sessions_are_resumed(self):
+        relay_server = RelayServer("127.0.0.1", 8080, 10, 2.0, 1.0, 60)
+        tls_context = create_server_context(self.certfile, self.keyfile)
+        response, session = self.request(relay_server, tls_context)
+        self.assertEqual(response, b"Invalid input value: Division by zero is not allowed\r\n")
+        self.request(relay_server, tls_context, session)
+        self.assertEqual(dict(relay_server.handshakes), {"full": 1, "resumed": 1})
+
+    def test_failed_handshake_is_counted(self):
+        relay_server = RelayServer("127.0.0.1", 8080, 10, 2.0, 1.0, 60)
+        tls_context = create_server_context(self.certfile, self.keyfile)
+        server, client = socket.socketpair()
+        conn = tls_context.wrap_socket(server, server_side=True, do_handshake_on_connect=False)
+        relay_server.current_clients += 1
+        worker = Thread(target=relay_server._process_request, args=(Client(conn, "test", 2.0),))
+        worker.start()
+        client.sendall(b"5 0 127.0.0.1 8081\n")
+        worker.join()
+        client.close()
+        self.assertEqual(dict(relay_server.disconnects), {"tls_handshake": 1})
+
+if __name__ == '__main__':
+    unittest.main()